@@ -8,10 +8,13 @@ OPIc Exam Page (feature/opic-questions 우선)
 
 import os
 import sys
+import copy
 import random
 import asyncio
 import base64
-from typing import List, Dict
+import threading
+import uuid
+from typing import Callable, List, Dict, Tuple
 
 # --- 프로젝트 루트 경로 추가 (필요 시) ---
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
@@ -21,9 +24,14 @@ if project_root not in sys.path:
 import streamlit as st
 
 # 내부 모듈
-from quest import make_questions
+from quest import make_exam_questions_async, iter_exam_questions_async, EXAM_TOPICS
+from app.utils.audio_preprocess import audio_format, audio_mime
+from app.utils.openai_api.client_provider import close_async_openai_client
 from .survey import get_survey_data, get_user_profile, KO_EN_MAPPING  # ← 오타/중복 주석 제거
-from app.utils.voice_utils import VoiceManager, unified_answer_input  # 음성 유틸
+from app.utils.voice_utils import (  # 음성 유틸
+    STT_PENDING_ANSWER, get_transcription_queue, get_tts_prefetcher, sync_transcripts, unified_answer_input,
+)
+from app.utils.openai_api.grading_queue import GradingQueue  # 백그라운드 채점
 
 # ========================
 # Helper Functions
@@ -33,31 +41,7 @@ def get_survey_topics_from_data() -> Dict[str, List[str]]:
     Extracts all possible survey topics to be used for the exam.
     (feature/opic-questions 분기에서 쓰던 기본 구조 유지)
     """
-    topic_structure = {
-        "survey": [
-            "have work experience", "living alone in a house/apartment", "living with friends in a house/apartment",
-            "living with family in a house/apartment", "dormitory", "military barracks", "student",
-            "museum", "watching sports", "TV", "watching cooking programs", "driving", "club", "park",
-            "Improving living space", "texting friends", "watching reality shows", "spa/massage shop",
-            "camping", "performance", "bar/pub", "billiard", "test preparation", "news", "shopping",
-            "beach", "volunteering", "chess", "cafe", "SNS", "movies", "game", "concert", "health",
-            "searching job", "reading books to children", "music", "musical instruments", "dancing",
-            "writing", "drawing", "cooking", "pets", "reading", "investing", "travel magazine", "singing",
-            "basketball", "baseball/softball", "soccer", "american football", "hockey", "cricket",
-            "golf", "volleyball", "tennis", "badminton", "table tennis", "swimming", "bicycling",
-            "skiing/snowboarding", "ice skating", "jogging", "walking", "yoga", "hiking/trekking",
-            "fishing", "taekwondo", "taking fitness classes", "do not exercise",
-            "domestic business trip", "overseas business trip", "staycation", "domestic travel",
-            "international travel", "newspaper", "taking photos"
-        ],
-        "role_play": [
-            "Getting Ready for Traveling", "Cancelling Appointment", "Item Purchase"
-        ],
-        "random_question": [
-            "technology", "industry", "recycling", "weather"
-        ]
-    }
-    return topic_structure
+    return copy.deepcopy(EXAM_TOPICS)
 
 
 def get_mapped_survey_topics() -> List[str]:
@@ -85,22 +69,17 @@ def get_mapped_survey_topics() -> List[str]:
 # ========================
 # Exam Generation (feature branch)
 # ========================
-async def create_opic_exam() -> List[str]:
+SELF_INTRO_QUESTION = "Tell me about yourself."
+
+
+def plan_opic_exam() -> Tuple[str, List[Tuple[str, str, int]]]:
     """
-    Generates a full 15-question OPIc-style exam based on the survey results.
-    1: 자기소개 1문항
-    2-10: 설문 기반 3세트 x 각 3문항
-    11-13: 롤플레이 3문항
-    14-15: 랜덤 2문항
+    설문 결과로 시험 블루프린트 구성 (세션 상태 접근이 필요하므로 메인 스레드에서 호출).
+    Returns (user_level, [(category, topic, count), ...]) for questions 2-15.
     """
-    exam_questions: List[str] = []
-
     survey_data = get_survey_data()
     user_level = survey_data.get("self_assessment", "level_5")
 
-    # 1. Self-introduction
-    exam_questions.append("Tell me about yourself.")
-
     # 2-10. Survey topics (3 topics x 3 questions)
     user_survey_topics = get_mapped_survey_topics()
     unique_topics = list({t for t in user_survey_topics if t})
@@ -111,30 +90,154 @@ async def create_opic_exam() -> List[str]:
         all_survey_topics = get_survey_topics_from_data()["survey"]
         topics_for_exam = random.sample(all_survey_topics, 3)
 
-    for topic in topics_for_exam:
-        questions = make_questions(topic, 'survey', user_level, 3)
-        exam_questions.extend(questions)
-
     # 11-13. Role-play (3 questions)
     role_play_topics = get_survey_topics_from_data()["role_play"]
     role_play_topic = random.choice(role_play_topics)
-    role_play_questions = make_questions(role_play_topic, 'role_play', user_level, 3)
-    exam_questions.extend(role_play_questions)
 
     # 14-15. Random (2 questions)
     random_question_topics = get_survey_topics_from_data()["random_question"]
     random_topic = random.choice(random_question_topics)
-    random_questions = make_questions(random_topic, 'random_question', user_level, 2)
-    exam_questions.extend(random_questions)
+
+    blueprint = [("survey", t, 3) for t in topics_for_exam]
+    blueprint += [("role_play", role_play_topic, 3), ("random_question", random_topic, 2)]
+    return user_level, blueprint
+
+
+async def create_opic_exam() -> List[str]:
+    """
+    Generates a full 15-question OPIc-style exam based on the survey results.
+    1: 자기소개 1문항
+    2-10: 설문 기반 3세트 x 각 3문항
+    11-13: 롤플레이 3문항
+    14-15: 랜덤 2문항
+    """
+    user_level, blueprint = plan_opic_exam()
+
+    # 1. Self-introduction
+    exam_questions: List[str] = [SELF_INTRO_QUESTION]
+
+    # 블루프린트 전체를 한 번에 생성 (시드 1회 조회 + GPT 호출 동시 실행)
+    generated = await make_exam_questions_async(blueprint, user_level)
+
+    for category, topic, _ in blueprint:
+        exam_questions.extend(generated[(category, topic)])
 
     return exam_questions
 
 
+class ExamGenerationJob:
+    """
+    백그라운드 시험 생성 작업.
+    - Q1(자기소개)은 즉시 사용 가능
+    - 나머지는 토픽 순서대로 생성되는 즉시 questions에 추가
+    - 스레드에서는 st.* 를 호출하지 않음 (세션 동기화는 렌더링 쪽에서 snapshot()으로)
+    - cancel() 후에는 남은 토픽을 생성하지 않고 on_update 도 호출하지 않음
+    """
+
+    def __init__(self, blueprint: List[Tuple[str, str, int]], user_level: str,
+                 on_update: Callable[[List[str]], None] | None = None):
+        self.blueprint = blueprint
+        self.on_update = on_update
+        self.user_level = user_level
+        self.expected_total = 1 + sum(n for _, _, n in blueprint)
+        self.done = False
+        self.cancelled = False
+        self.error: Exception | None = None
+        self._questions: List[str] = [SELF_INTRO_QUESTION]
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="exam-generation", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            asyncio.run(self._generate())
+        except Exception as e:
+            print(f"[exam generation error] {e}")
+            self.error = e
+        finally:
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+
+    async def _generate(self):
+        try:
+            async for _, questions in iter_exam_questions_async(self.blueprint, self.user_level):
+                with self._cond:
+                    if self.cancelled:
+                        break
+                    self._questions.extend(questions)
+                    snapshot = list(self._questions)
+                    on_update = self.on_update
+                    self._cond.notify_all()
+                if on_update is not None:
+                    on_update(snapshot)
+        finally:
+            # asyncio.run 이 만든 루프 전용 클라이언트 정리
+            await close_async_openai_client()
+
+    def cancel(self) -> None:
+        """시험 재시작 시 호출: 이후 생성 결과는 버리고 on_update 콜백도 끊음."""
+        with self._cond:
+            self.cancelled = True
+            self.on_update = None
+            self._cond.notify_all()
+
+    def snapshot(self) -> List[str]:
+        with self._cond:
+            return list(self._questions)
+
+    def total(self) -> int:
+        """진행도 표시용 전체 문항 수 (생성 완료 전에는 예상치)."""
+        with self._cond:
+            return len(self._questions) if self.done else max(self.expected_total, len(self._questions))
+
+    def wait_for(self, count: int, timeout: float) -> bool:
+        """문항이 count개 이상 준비되거나 생성이 끝날 때까지 최대 timeout초 대기."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.done or len(self._questions) >= count, timeout)
+
+
+def start_exam_generation() -> ExamGenerationJob:
+    """블루프린트를 만들고 백그라운드 생성을 시작 (Q1은 바로 exam_questions에 반영)."""
+    user_level, blueprint = plan_opic_exam()
+    # 새로 생성된 문제는 화면 갱신을 기다리지 않고 바로 TTS 선생성 예약
+    prefetcher = get_tts_prefetcher()
+    job = ExamGenerationJob(blueprint, user_level, on_update=prefetcher.prefetch)
+    prefetcher.prefetch(job.snapshot(), 0)
+    st.session_state["exam_job"] = job
+    st.session_state["exam_questions"] = job.snapshot()
+    return job
+
+
+def _sync_exam_questions() -> Tuple[List[str], ExamGenerationJob | None]:
+    """백그라운드 작업에서 지금까지 생성된 문항을 세션 상태로 복사."""
+    job = st.session_state.get("exam_job")
+    if job is not None:
+        st.session_state["exam_questions"] = job.snapshot()
+    return st.session_state["exam_questions"], job
+
+
 async def get_final_questions_for_streamlit() -> List[str]:
     """Streamlit에서 최종 15문항 불러올 엔트리 포인트."""
     return await create_opic_exam()
 
 
+def get_grading_queue() -> GradingQueue:
+    """세션별 백그라운드 채점 큐."""
+    queue = st.session_state.get("grading_queue")
+    if queue is None:
+        queue = GradingQueue(st.session_state.get("survey_data", {}))
+        st.session_state["grading_queue"] = queue
+    return queue
+
+
+def _apply_finished_transcripts(questions: List[str]) -> None:
+    """백그라운드 STT 결과를 답변에 반영하고, 변환 대기로 확정됐던 문항은 이제 채점 요청."""
+    for idx, transcript in sync_transcripts():
+        if idx < len(questions):
+            get_grading_queue().submit(idx + 1, questions[idx], transcript)
+
+
 # ========================
 # GIF Utilities (확실히 움직이게)
 # ========================
@@ -157,22 +260,28 @@ def _gif_to_base64_html(gif_path: str, width: int | None = None) -> str:
 def show_exam():
     if "stage" not in st.session_state:
         st.session_state.stage = "intro"
-    # 세션 준비
-    if "exam_questions" not in st.session_state or not st.session_state["exam_questions"]:
-        # 최초 진입 시 비동기 생성
-        with st.spinner("문제를 생성하는 중..."):
-            qs = asyncio.run(get_final_questions_for_streamlit())
-        st.session_state["exam_questions"] = qs
+    # 세션 준비: 최초 진입 시 백그라운드 생성 시작 (Q1은 즉시 표시)
+    if not st.session_state.get("exam_questions") and st.session_state.get("exam_job") is None:
+        start_exam_generation()
 
     if "exam_answers" not in st.session_state or not isinstance(st.session_state["exam_answers"], list):
         st.session_state["exam_answers"] = []
     if "exam_idx" not in st.session_state:
         st.session_state["exam_idx"] = 0
 
-    questions = st.session_state["exam_questions"]
+    questions, job = _sync_exam_questions()
+    _apply_finished_transcripts(questions)
     exam_idx = st.session_state["exam_idx"]
+    generating = job is not None and not job.done
+    total_questions = job.total() if job is not None else len(questions)
 
     if exam_idx >= len(questions):
+        if generating:
+            # 사용자가 생성보다 앞서간 경우에만 대기
+            with st.spinner("다음 문제를 생성하는 중..."):
+                job.wait_for(exam_idx + 1, timeout=1.0)
+            st.rerun()
+            return
         # 바로 feedback 페이지로 이동 (버튼/메시지 없이)
         st.session_state.stage = "feedback"
         st.rerun()
@@ -183,8 +292,10 @@ def show_exam():
     # 상단 진행 상태
     st.title("🗣️ OPIc Buddy TEST")
     # 진행도 텍스트
-    st.markdown(f"<div style='font-size:1.1rem; color:#666; margin-bottom:4px;'>진행도: {exam_idx + 1} / {len(questions)}</div>", unsafe_allow_html=True)
-    st.progress((exam_idx + 1) / len(questions))
+    st.markdown(f"<div style='font-size:1.1rem; color:#666; margin-bottom:4px;'>진행도: {exam_idx + 1} / {total_questions}</div>", unsafe_allow_html=True)
+    st.progress(min(1.0, (exam_idx + 1) / total_questions))
+    if job is not None and job.done and job.error:
+        st.warning("일부 문제 생성에 실패했습니다. 준비된 문제로 시험을 진행합니다.")
 
     # 차차(GIF) 왼쪽, 문제 텍스트 토글+오디오 안내 오른쪽 (세로 배치)
     st.markdown("<div style='height: 8px'></div>", unsafe_allow_html=True)
@@ -193,37 +304,25 @@ def show_exam():
     with col_left:
         st.markdown(chacha_gif_html, unsafe_allow_html=True)
 
-    # 오디오 데이터 생성/캐싱은 col_right 밖에서 항상 exam_idx, current_question 기준으로 실행
-    if 'tts_audio_cache' not in st.session_state:
-        st.session_state['tts_audio_cache'] = {}
-    tts_key = f"q{exam_idx}_tts"
-    audio_data = st.session_state['tts_audio_cache'].get(tts_key)
+    # 오디오 데이터: 준비된 문제 전체를 백그라운드로 선생성하고, 현재 문제는 캐시에서 꺼냄
+    prefetcher = get_tts_prefetcher()
+    prefetcher.prefetch(questions, exam_idx)
+    audio_data = prefetcher.cached(current_question)
     if audio_data is None:
-        import uuid
         with st.spinner("문제 음성 변환 중..."):
-            voice_manager = VoiceManager()
-            audio_data = voice_manager.text_to_speech(current_question)
-            st.session_state['tts_audio_cache'][tts_key] = audio_data
+            audio_data = prefetcher.get(current_question)
+        if audio_data is None:
+            st.error("TTS 오류: 문제 음성을 생성하지 못했습니다.")
 
     # 오디오 플레이어는 col_right 밖(상단)에 항상 위치
+    # st.audio → Streamlit 미디어 파일 관리자의 /media/<내용 해시> URL (rerun 해도 같은 URL → 재다운로드 없음,
+    # 웹소켓에는 URL 만 전송, Range 요청 지원)
     if audio_data:
-        try:
-            import base64, uuid
-            b64 = base64.b64encode(audio_data).decode()
-            audio_id = f"question-audio-{exam_idx}-{uuid.uuid4()}"
-            audio_html = f'''
-                <div style="text-align:left; margin: 12px 0 0 0; padding: 12px 18px; background: #f8f9fa; border-radius: 10px; box-shadow: 0 1px 4px #0001; border: 1px solid #e3e6ea;">
-                    <b style="color:#1976d2;">문제 오디오</b><br>
-                    <audio id="{audio_id}" controls style="width:100%; margin-top:4px;">
-                        <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
-                        <source src="data:audio/mpeg;base64,{b64}" type="audio/mpeg">
-                        Your browser does not support the audio element.
-                    </audio>
-                </div>
-            '''
-            st.markdown(audio_html, unsafe_allow_html=True)
-        except Exception as e:
-            st.error(f"audio 태그 예외: {e}")
+        with st.container(border=True):
+            st.markdown("<b style='color:#1976d2;'>문제 오디오</b>", unsafe_allow_html=True)
+            # 백엔드에 따라 mp3(OpenAI) 또는 wav(로컬 엔진)
+            mime = "audio/mpeg" if audio_format(audio_data) == "mp3" else audio_mime(audio_data)
+            st.audio(audio_data, format=mime)
 
     # col_right 안에는 안내 메시지만 배치
     with col_right:
@@ -261,10 +360,6 @@ def show_exam():
     with col1:
         back_label = "← Survey" if exam_idx == 0 else "← Back"
         if st.button(back_label, key=f"back_btn_{exam_idx}"):
-            # 문제 이동 시 현재 문제의 오디오 캐시만 삭제
-            tts_key = f"q{exam_idx}_tts"
-            if 'tts_audio_cache' in st.session_state and tts_key in st.session_state['tts_audio_cache']:
-                del st.session_state['tts_audio_cache'][tts_key]
             if exam_idx == 0:
                 st.session_state.stage = "survey"
             else:
@@ -277,22 +372,27 @@ def show_exam():
             # text_input_x의 키를 변경하여 위젯을 새로 렌더링 (세션 상태 직접 할당 X)
             st.session_state[f"text_input_key_{exam_idx}"] = str(uuid.uuid4())
             st.session_state[f"audio_data_{exam_idx}"] = None
+            get_transcription_queue().discard(exam_idx)
             st.session_state.user_input = ""
             st.session_state[f"play_gif_{exam_idx}"] = False
             st.rerun()
     with col3:
         if st.button("→ Next", key=f"next_btn_{exam_idx}"):
-            # 문제 이동 시 현재 문제의 오디오 캐시만 삭제
-            tts_key = f"q{exam_idx}_tts"
-            if 'tts_audio_cache' in st.session_state and tts_key in st.session_state['tts_audio_cache']:
-                del st.session_state['tts_audio_cache'][tts_key]
             recorded_answer = answer.strip() if answer and answer.strip() else "무응답"
+            # 변환 대기 자리표시자 외의 "[Voice recording ...]" (STT 불가/오류)는 무응답 처리
+            if recorded_answer.startswith("[Voice recording") and recorded_answer != STT_PENDING_ANSWER:
+                recorded_answer = "무응답"
             st.session_state.exam_answers.append(recorded_answer)
+            # 확정된 답변은 바로 백그라운드 채점 (피드백 페이지 대기 시간 단축)
+            # 음성 변환 중이면 기다리지 않고 넘어가고, 변환이 끝나는 렌더링에서 채점 요청
+            if recorded_answer != STT_PENDING_ANSWER:
+                get_grading_queue().submit(exam_idx + 1, current_question, recorded_answer)
+            # 녹음 blob 핸들만 보관 (bytes 는 세션 blob 저장소)
             audio_key = f"audio_data_{exam_idx}"
-            answer_audio_data = st.session_state.get(audio_key)
+            answer_audio_ref = st.session_state.get(audio_key)
             if "answer_audio_files" not in st.session_state:
                 st.session_state["answer_audio_files"] = []
-            st.session_state["answer_audio_files"].append(answer_audio_data)
+            st.session_state["answer_audio_files"].append(answer_audio_ref)
             st.session_state.user_input = ""
             st.session_state.exam_idx += 1
             st.rerun()
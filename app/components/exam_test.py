@@ -2,7 +2,7 @@
 """
 Exam Test Page — 고정 설문으로 질문 생성 체크 전용 (레벨 5 고정)
 - 음성/피드백 없이, 질문 생성만 검증합니다.
-- quest.py의 make_questions(topic, category, level, count) 시그니처에 맞춰 호출합니다.
+- quest.py의 make_questions_async(topic, category, level, count) 시그니처에 맞춰 호출합니다.
 """
 from __future__ import annotations
 import sys
@@ -15,7 +15,8 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 try:
-    from quest import load_survey_map, make_questions  # type: ignore
+    from quest import load_survey_map, make_questions_async  # type: ignore
+    from app.utils.openai_api.client_provider import close_async_openai_client  # type: ignore
     QUEST_OK = True
 except Exception as e:
     QUEST_OK = False
@@ -44,8 +45,11 @@ def flatten_activities(acts: dict) -> list[str]:
     return list(dict.fromkeys(keys))
 
 async def _gen_for_topics(topics: list[str], category: str, level: str, count: int) -> dict[str, list[str]]:
-    tasks = [make_questions(t, category, level, count) for t in topics]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    tasks = [make_questions_async(t, category, level, count) for t in topics]
+    try:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await close_async_openai_client()
     out: dict[str, list[str]] = {}
     for t, r in zip(topics, results):
         if isinstance(r, Exception):
@@ -1,18 +1,25 @@
 # app/components/feedback.py
-import time
 from pathlib import Path
 import streamlit as st
 
 ROOT = Path(__file__).resolve().parents[1].parent
 
+# 피드백 요청 시 백그라운드 채점 완료를 기다리는 최대 시간(초)
+PREGRADED_WAIT_SECONDS = 20
+# 피드백 요청 시 아직 변환 중인 음성 답변을 기다리는 최대 시간(초)
+TRANSCRIPT_WAIT_SECONDS = 30
+
 # ===== [3] OPICFeedbackService (ComprehensiveOPIcTutor 래퍼) =====
 class OPICFeedbackService:
     def __init__(self):
         from app.utils.openai_api.comprehensive_tutor import ComprehensiveOPIcTutor
         self.tutor = ComprehensiveOPIcTutor()
 
-    def run(self, questions, answers, survey_data):
-        return self.tutor.get_comprehensive_feedback(questions, answers, survey_data)
+    def run(self, questions, answers, survey_data, pregraded=None):
+        return self.tutor.get_comprehensive_feedback(questions, answers, survey_data, pregraded=pregraded)
+
+    def stream(self, questions, answers, survey_data, pregraded=None):
+        return self.tutor.iter_comprehensive_feedback(questions, answers, survey_data, pregraded=pregraded)
 
 # ===== [4] 텍스트 하이라이트 유틸 =====
 import difflib, re
@@ -69,13 +76,15 @@ def highlight_text_differences(original_text, improved_text):
 
 # ===== [2] 피드백 UI 패널 =====
 try:
-    from app.utils.voice_utils import VoiceManager
+    from app.utils.voice_utils import VoiceManager, sync_transcripts
     VOICE_AVAILABLE = True
 except ImportError:
     VOICE_AVAILABLE = False
 
 def show_feedback_page():
     st.title("OPIc Buddy — 종합 피드백")
+    if VOICE_AVAILABLE:
+        sync_transcripts()  # 시험 중 끝난 음성 변환 결과 반영
 
     questions = st.session_state.get("exam_questions", [])
     answers   = st.session_state.get("exam_answers", [])
@@ -117,37 +126,145 @@ def show_feedback_page():
             st.session_state.exam_idx = 0
             st.session_state.exam_answers = []
             st.session_state.exam_questions = []
+            # 생성 중인 시험이 종료된 TTS 선생성기에 콜백하지 않도록 먼저 취소
+            job = st.session_state.get("exam_job")
+            if job is not None:
+                job.cancel()
+            st.session_state.exam_job = None
+            queue = st.session_state.pop("grading_queue", None)
+            if queue is not None:
+                queue.shutdown()
+            from app.utils.blob_store import reset_session_blobs
+            from app.utils.voice_utils import reset_transcription_queue, reset_tts_prefetcher
+            reset_tts_prefetcher()
+            reset_transcription_queue()
+            st.session_state.pop("answer_audio_files", None)
+            reset_session_blobs()
             st.rerun()
 
 def _generate_feedback():
     try:
         progress_bar = st.progress(0)
         status = st.empty()
+        provisional_area = st.empty()  # 로컬 잠정 점수 (LLM 채점 전 즉시 표시)
+        stream_area = st.empty()  # 채점되는 대로 문항 카드를 보여주고, 완료 후 비움
         with st.spinner("🔍 분석 중..."):
             status.text("답변 로딩...")
-            progress_bar.progress(25)
+
+            # 아직 변환 중인 음성 답변만 기다린 뒤 반영 (끝내 실패/미완료면 무응답 처리)
+            stt_queue = st.session_state.get("transcription_queue")
+            if stt_queue is not None and stt_queue.pending():
+                status.text("음성 답변 변환 마무리...")
+                stt_queue.wait(timeout=TRANSCRIPT_WAIT_SECONDS)
+            if VOICE_AVAILABLE:
+                sync_transcripts(finalize=True)
 
             questions = st.session_state.exam_questions
             answers   = st.session_state.exam_answers
             survey    = st.session_state.get("survey_data", {})
 
+            _show_provisional_score(provisional_area, questions, answers)
+
+            # 시험 중 백그라운드로 채점된 문항은 재사용 (진행 중인 채점은 잠시 기다림)
+            pregraded = {}
+            queue = st.session_state.get("grading_queue")
+            if queue is not None:
+                status.text("진행 중인 채점 마무리...")
+                pregraded = queue.collect(questions, answers, timeout=PREGRADED_WAIT_SECONDS)
+
             svc = OPICFeedbackService()
             status.text("OPIc 레벨 평가 중...")
-            progress_bar.progress(60)
-            fb = svc.run(questions, answers, survey)
+            fb = None
+            with stream_area.container():
+                for event in svc.stream(questions, answers, survey, pregraded=pregraded):
+                    if event["type"] == "item":
+                        progress_bar.progress(event["done"] / max(1, event["total"]))
+                        status.text(f"문항별 채점 중... ({event['done']}/{event['total']})")
+                        _render_feedback_item(event["item"], questions, answers, interactive=False)
+                    elif event["type"] == "result":
+                        fb = event["feedback"]
+                        status.text("종합 평가 정리 중...")
 
-            status.text("피드백 정리 중...")
-            progress_bar.progress(90)
             st.session_state.comprehensive_feedback = fb
-
             progress_bar.progress(100)
-            time.sleep(0.3)
+        provisional_area.empty()
+        stream_area.empty()
         status.empty()
         progress_bar.empty()
         st.success("🎊 분석 완료!")
     except Exception as e:
         st.error(f"❌ 피드백 생성 오류: {e}")
 
+def _show_provisional_score(area, questions, answers):
+    """LLM 채점 전에 로컬 어휘 특징 기반 잠정 점수/레벨을 바로 표시."""
+    from app.utils.openai_api.local_scorer import get_local_scorer
+    local = get_local_scorer().score(questions, answers)
+    with area.container():
+        col1, col2 = st.columns(2)
+        col1.metric("⚡ 잠정 점수", f"{local['overall_score']}/100")
+        col2.metric("⚡ 잠정 레벨", local["opic_level"])
+        st.caption("답변 길이·어휘 다양성·연결어 등으로 즉시 계산한 예상치입니다. 정밀 채점 결과가 곧 표시됩니다.")
+
+def _render_feedback_item(item, qs, ans, interactive=True):
+    """문항 하나의 피드백 카드 (interactive=False면 스트리밍 중 미리보기: 버튼 없이 표시)."""
+    answer_audio_files = st.session_state.get("answer_audio_files", [None]*len(ans))
+    qn = item.get("question_num", 0)
+    i = qn - 1
+    if i < 0 or i >= len(qs):
+        return
+    with st.expander(f"Q{qn} - 점수: {item.get('score',0)}/100", expanded=False):
+        st.markdown("### 📋 질문")
+        st.info(qs[i])
+
+        st.markdown("### 📝 내 답변")
+        user_answer = ans[i] if i < len(ans) else ""
+        st.write(f'"{user_answer}"' if user_answer else "_(답변 없음)_")
+        # 내 답변 오디오 듣기 버튼 (항상 표시, 파일이 있으면 재생)
+        audio_ref = answer_audio_files[i] if i < len(answer_audio_files) else None
+        if interactive and st.button("🎤 내 답변 듣기", key=f"play_my_{qn}"):
+            from app.utils.blob_store import load_blob
+            audio_file = load_blob(audio_ref)
+            if audio_file:
+                from app.utils.audio_preprocess import audio_mime
+                st.audio(audio_file, format=audio_mime(audio_file))
+            else:
+                st.warning("녹음된 음성 파일이 없습니다.")
+
+        st.markdown("### 💭 피드백")
+        c1, c2 = st.columns(2)
+        with c1:
+            st.subheader("💪 잘한 점")
+            for s in item.get("strengths", []):
+                st.write(f"• {s}")
+        with c2:
+            st.subheader("🎯 개선점")
+            for g in item.get("improvements", []):
+                st.write(f"→ {g}")
+
+        sample = item.get("sample_answer","")
+        if sample:
+            st.markdown("### ✨ 개선된 모범답안")
+            st.markdown(
+                '<span style="font-size:0.98em;">'
+                ' <span style="color:#d32f2f;font-weight:600;">빨간색</span>: 문법 수정 '
+                ' <span style="color:#1976d2;font-weight:600;">파란색</span>: 내용 추가/개선'
+                '</span>', unsafe_allow_html=True)
+            html = highlight_text_differences(user_answer, sample)
+            st.markdown(
+                '<div style="background-color:#f8f9fa;padding:16px;border-radius:8px;'
+                'border-left:4px solid #0d6efd;margin:10px 0;">'
+                f'<div style="font-style:italic;line-height:1.8;color:#495057;font-size:1.05em;">"{html}"</div>'
+                '</div>',
+                unsafe_allow_html=True
+            )
+            if interactive and VOICE_AVAILABLE and st.button("🎧 모범답안 듣기", key=f"play_sample_{qn}"):
+                try:
+                    audio_bytes = VoiceManager().text_to_speech(sample.strip())
+                    if audio_bytes:
+                        st.audio(audio_bytes)
+                except Exception as e:
+                    st.error(f"TTS 오류: {e}")
+
 def _display_feedback():
     fb = st.session_state.get("comprehensive_feedback", {})
     if not fb:
@@ -175,61 +292,8 @@ def _display_feedback():
     qs = st.session_state.exam_questions
     ans = st.session_state.exam_answers
 
-    answer_audio_files = st.session_state.get("answer_audio_files", [None]*len(ans))
     for item in indiv:
-        qn = item.get("question_num", 0)
-        i = qn - 1
-        if i < 0 or i >= len(qs):
-            continue
-        with st.expander(f"Q{qn} - 점수: {item.get('score',0)}/100", expanded=False):
-            st.markdown("### 📋 질문")
-            st.info(qs[i])
-
-            st.markdown("### 📝 내 답변")
-            user_answer = ans[i] if i < len(ans) else ""
-            st.write(f'"{user_answer}"' if user_answer else "_(답변 없음)_")
-            # 내 답변 오디오 듣기 버튼 (항상 표시, 파일이 있으면 재생)
-            audio_file = answer_audio_files[i] if i < len(answer_audio_files) else None
-            if st.button("🎤 내 답변 듣기", key=f"play_my_{qn}"):
-                if audio_file:
-                    st.audio(audio_file, format="audio/mp3")
-                else:
-                    st.warning("녹음된 음성 파일이 없습니다.")
-
-            st.markdown("### 💭 피드백")
-            c1, c2 = st.columns(2)
-            with c1:
-                st.subheader("💪 잘한 점")
-                for s in item.get("strengths", []):
-                    st.write(f"• {s}")
-            with c2:
-                st.subheader("🎯 개선점")
-                for g in item.get("improvements", []):
-                    st.write(f"→ {g}")
-
-            sample = item.get("sample_answer","")
-            if sample:
-                st.markdown("### ✨ 개선된 모범답안")
-                st.markdown(
-                    '<span style="font-size:0.98em;">'
-                    ' <span style="color:#d32f2f;font-weight:600;">빨간색</span>: 문법 수정 '
-                    ' <span style="color:#1976d2;font-weight:600;">파란색</span>: 내용 추가/개선'
-                    '</span>', unsafe_allow_html=True)
-                html = highlight_text_differences(user_answer, sample)
-                st.markdown(
-                    '<div style="background-color:#f8f9fa;padding:16px;border-radius:8px;'
-                    'border-left:4px solid #0d6efd;margin:10px 0;">'
-                    f'<div style="font-style:italic;line-height:1.8;color:#495057;font-size:1.05em;">"{html}"</div>'
-                    '</div>',
-                    unsafe_allow_html=True
-                )
-                if VOICE_AVAILABLE and st.button("🎧 모범답안 듣기", key=f"play_sample_{qn}"):
-                    try:
-                        audio_bytes = VoiceManager().text_to_speech(sample.strip())
-                        if audio_bytes:
-                            st.audio(audio_bytes)
-                    except Exception as e:
-                        st.error(f"TTS 오류: {e}")
+        _render_feedback_item(item, qs, ans)
 
     st.markdown("## 🎯 종합 평가")
     for title, key in [("🌟 전체 강점","overall_strengths"), ("📈 우선 개선사항","priority_improvements")]:
@@ -1,6 +1,5 @@
 import streamlit as st
 import os
-import asyncio
 from components.intro import show_intro
 from components.survey import show_survey
 from components import exam as exam_mod # <--- Corrected import statement
@@ -17,6 +16,7 @@ def initialize_session_state():
         "exam_questions": [],
         "exam_answers": [],
         "exam_idx": 0,
+        "exam_job": None,
         "feedback_payload": None,
     }
     for k, v in defaults.items():
@@ -38,17 +38,8 @@ def main():
         show_survey()
 
     elif stage == "exam":
-        # exam 모듈은 지연 임포트 (안전)
-        # Note: The import is moved outside of the main() function for better practice,
-        # but the original code worked by calling the module, not the function.
-        # It's better to import at the top of the file for clarity.
-
-        # 비동기 함수를 사용하여 문제 생성
-        # `exam_questions`가 비어있을 때만 문제를 생성합니다.
-        if not st.session_state.get("exam_questions"):
-            with st.spinner("Generating OPIc questions..."):
-                st.session_state["exam_questions"] = asyncio.run(exam_mod.create_opic_exam())
-
+        # 문제 생성은 show_exam에서 백그라운드 작업으로 시작
+        # (Q1은 즉시 표시, 나머지는 생성되는 대로 exam_questions에 추가)
         exam_mod.show_exam()
 
     elif stage == "feedback":
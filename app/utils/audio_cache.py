@@ -0,0 +1,130 @@
+"""
+TTS 음성 공유 캐시 (세션/프로세스 재시작 간 공유)
+- 키: sha256(text, voice, model, format) → 같은 문장은 한 번만 합성
+- 메모리: 총 바이트 기준 LRU
+- 디스크: 로컬 디렉터리에 <hash>.<format> 으로 보관 (재시작 후에도 유지, 용량 초과 시 오래된 파일부터 삭제)
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(ROOT_DIR, "data", "cache", "tts"))
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+
+
+def tts_cache_key(text: str, voice: str, model: str, fmt: str) -> str:
+    payload = json.dumps([text.strip(), voice, model, fmt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSAudioCache:
+    def __init__(self, directory: Optional[str] = TTS_CACHE_DIR,
+                 max_memory_bytes: int = TTS_CACHE_MEMORY_BYTES,
+                 max_disk_bytes: int = TTS_CACHE_DISK_BYTES):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    # ---------- 메모리 LRU ----------
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # ---------- 디스크 ----------
+    def path_for(self, key: str, fmt: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def _read_disk(self, key: str, fmt: str) -> Optional[bytes]:
+        path = self.path_for(key, fmt)
+        if not path:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # 최근 사용 표시 (디스크 정리 기준)
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, fmt: str, data: bytes) -> None:
+        path = self.path_for(key, fmt)
+        if not path:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self._prune_disk()
+        except OSError as e:
+            print(f"tts cache write failed: {e}")
+
+    def _prune_disk(self) -> None:
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.is_file() and not e.name.endswith(".tmp")]
+        except OSError:
+            return
+        total = sum(e.stat().st_size for e in entries)
+        if total <= self.max_disk_bytes:
+            return
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+
+    # ---------- 공개 API ----------
+    def get(self, key: str, fmt: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+        data = self._read_disk(key, fmt)
+        if data is not None:
+            with self._lock:
+                self._remember(key, data)
+        return data
+
+    def put(self, key: str, fmt: str, data: bytes) -> None:
+        if not data:
+            return
+        with self._lock:
+            self._remember(key, data)
+        self._write_disk(key, fmt, data)
+
+
+_shared_cache: Optional[TTSAudioCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_tts_cache() -> TTSAudioCache:
+    """프로세스 전역 TTS 캐시 (모든 Streamlit 세션이 공유)."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = TTSAudioCache()
+        return _shared_cache
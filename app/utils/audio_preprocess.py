@@ -0,0 +1,175 @@
+"""
+녹음 오디오 전처리 (STT 업로드 / 세션 저장 전)
+- st.audio_input 의 WAV(PCM)를 numpy 배열로 디코드
+- 다운믹스(mono) → 16 kHz 리샘플 (windowed-sinc 저역통과 + 선형 보간)
+- 에너지 기반 VAD 로 앞뒤 무음 제거 (프레임 RMS, 노이즈 플로어/피크 기준)
+- 16-bit PCM WAV 로 재인코딩, soundfile 이 있으면 FLAC/OGG(Vorbis) 선택 가능 (AUDIO_CODEC)
+  48 kHz 스테레오 60초 ≈ 11 MB → 16 kHz 모노 ≈ 1.9 MB (+ 무음 제거, FLAC 은 추가로 ~절반)
+- 디코드할 수 없는 입력은 원본 그대로 반환
+- split_windows: 긴 녹음을 겹치는 구간(window)으로 분할 (청크 단위 병렬 STT 용)
+"""
+import io
+import os
+import wave
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+TARGET_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 30
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "250"))            # 잘린 구간 앞뒤 여유
+VAD_PEAK_RATIO_DB = float(os.getenv("VAD_PEAK_RATIO_DB", "-35"))  # 최대 프레임 에너지 대비 임계값
+VAD_NOISE_FACTOR = 3.0                                     # 노이즈 플로어(하위 10% RMS) 대비 배수
+
+
+def _resolve_codec(name: str) -> str:
+    name = (name or "wav").lower()
+    if name in ("flac", "ogg") and SOUNDFILE_AVAILABLE:
+        return name
+    return "wav"
+
+
+AUDIO_CODEC = _resolve_codec(os.getenv("AUDIO_CODEC", "wav"))
+
+
+def audio_format(data: bytes) -> str:
+    """매직 바이트로 컨테이너 형식 판별 (STT 파일명 / st.audio format 용)."""
+    head = (data or b"")[:4]
+    if head == b"fLaC":
+        return "flac"
+    if head == b"OggS":
+        return "ogg"
+    if head[:3] == b"ID3" or head[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "mp3"
+    return "wav"
+
+
+def audio_mime(data: bytes) -> str:
+    return f"audio/{audio_format(data)}"
+
+
+# ---------------------- 디코드 / 인코드 ---------------------- #
+def decode_wav(data: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """PCM WAV → (float32 [-1, 1] 배열 (frames, channels), sample_rate). 지원하지 않는 형식이면 None."""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as w:
+            channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+            raw = w.readframes(w.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        samples = (np.where(ints >= 1 << 23, ints - (1 << 24), ints)).astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        return None
+    frames = len(samples) // channels
+    return samples[:frames * channels].reshape(frames, channels), rate
+
+
+def encode_wav(samples: np.ndarray, rate: int) -> bytes:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+def encode(samples: np.ndarray, rate: int, codec: str = AUDIO_CODEC) -> bytes:
+    if codec in ("flac", "ogg") and SOUNDFILE_AVAILABLE:
+        buf = io.BytesIO()
+        sf.write(buf, samples, rate, format=codec.upper(), subtype="VORBIS" if codec == "ogg" else "PCM_16")
+        return buf.getvalue()
+    return encode_wav(samples, rate)
+
+
+# ---------------------- 신호 처리 ---------------------- #
+def downmix(samples: np.ndarray) -> np.ndarray:
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def _lowpass_kernel(cutoff: float, taps: int = 63) -> np.ndarray:
+    """cutoff: 샘플링 주파수 대비 정규화 차단 주파수 (0~0.5)."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return kernel / kernel.sum()
+
+
+def resample(samples: np.ndarray, rate: int, target: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    if rate == target or len(samples) == 0:
+        return samples
+    if rate > target:
+        # 에일리어싱 방지: 목표 나이퀴스트의 90%에서 저역통과
+        samples = np.convolve(samples, _lowpass_kernel(0.45 * target / rate), mode="same")
+    duration = len(samples) / rate
+    n_out = int(round(duration * target))
+    src_t = np.arange(len(samples)) / rate
+    dst_t = np.arange(n_out) / target
+    return np.interp(dst_t, src_t, samples).astype(np.float32)
+
+
+def trim_silence(samples: np.ndarray, rate: int) -> np.ndarray:
+    """프레임 RMS 가 임계값을 넘는 첫/마지막 프레임 사이만 남김 (앞뒤 VAD_PAD_MS 여유). 음성이 없으면 그대로."""
+    frame = max(1, int(rate * VAD_FRAME_MS / 1000))
+    n_frames = len(samples) // frame
+    if n_frames < 2:
+        return samples
+    rms = np.sqrt(np.mean(samples[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+    noise_floor = np.percentile(rms, 10)
+    threshold = max(noise_floor * VAD_NOISE_FACTOR, rms.max() * 10 ** (VAD_PEAK_RATIO_DB / 20), 1e-4)
+    voiced = np.flatnonzero(rms > threshold)
+    if voiced.size == 0:
+        return samples
+    pad = int(rate * VAD_PAD_MS / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def preprocess_audio(data: bytes, codec: str = AUDIO_CODEC) -> bytes:
+    """녹음 WAV → 무음 제거된 16 kHz 모노 (codec 형식). 디코드 실패 시 원본."""
+    decoded = decode_wav(data) if data else None
+    if decoded is None:
+        return data
+    samples, rate = decoded
+    mono = resample(downmix(samples), rate)
+    return encode(trim_silence(mono, TARGET_SAMPLE_RATE), TARGET_SAMPLE_RATE, codec)
+
+
+def split_windows(data: bytes, window_s: float, overlap_s: float) -> List[bytes]:
+    """
+    WAV 를 window_s 초 길이, overlap_s 초씩 겹치는 구간들로 분할 (각 구간은 16-bit PCM WAV).
+    경계에서 잘린 단어는 인접 구간의 겹친 부분에 온전히 들어감 → stitch 로 중복 제거.
+    디코드할 수 없거나 한 구간 이하 길이면 [원본].
+    """
+    decoded = decode_wav(data) if data else None
+    if decoded is None or window_s <= overlap_s:
+        return [data]
+    samples, rate = decoded
+    mono = downmix(samples)
+    window = int(window_s * rate)
+    if len(mono) <= window:
+        return [data]
+    step = window - int(overlap_s * rate)
+    starts = list(range(0, len(mono) - window, step))
+    # 마지막 구간은 끝까지 — 남은 길이가 1초 미만이면 직전 구간에 붙임 (짧은 조각 STT 방지)
+    if len(mono) - (starts[-1] + window) < rate:
+        bounds = [(st, st + window) for st in starts[:-1]] + [(starts[-1], len(mono))]
+    else:
+        bounds = [(st, st + window) for st in starts] + [(starts[-1] + step, len(mono))]
+    return [encode_wav(mono[a:b], rate) for a, b in bounds]
@@ -0,0 +1,186 @@
+"""
+세션 오디오 blob 저장소 (녹음 답변)
+- st.session_state 에는 bytes 대신 작은 핸들(BlobRef)만 보관 → 세션당 메모리 수십 MB → 수백 바이트
+- 실제 데이터는 임시 디렉터리의 세션별 폴더에 <sha256>.<format> 파일로 저장 (내용 주소 → 같은 오디오는 1벌)
+  audio_data_{idx} / audio_{idx} / answer_audio_files 가 같은 파일을 가리킴
+- 세션별 용량 상한 초과 시 오래된 파일부터 삭제, 마지막 사용 후 BLOB_TTL_SECONDS 지난 세션 폴더는 정리
+  (Streamlit 은 세션 종료 훅이 없으므로 put 시 주기적으로 TTL 정리)
+- 문제 음성(TTS)은 공유 캐시(audio_cache)에 이미 있으므로 여기 복사하지 않음 (세션 용량은 녹음 전용)
+- 스레드에서는 세션 id 를 넘겨 BlobStore 를 직접 사용 (st.* 호출 없음)
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import streamlit as st
+
+from app.utils.audio_preprocess import audio_format
+
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(tempfile.gettempdir(), "opic_session_blobs"))
+BLOB_SESSION_MAX_BYTES = int(os.getenv("BLOB_SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+BLOB_TTL_SECONDS = float(os.getenv("BLOB_TTL_SECONDS", str(6 * 3600)))
+BLOB_CLEANUP_INTERVAL = 600  # TTL 정리 최소 간격(초)
+
+
+@dataclass(frozen=True)
+class BlobRef:
+    """세션 상태에 보관하는 핸들 (데이터 없음)."""
+    session: str
+    digest: str
+    fmt: str
+    size: int
+
+    @property
+    def filename(self) -> str:
+        return f"{self.digest}.{self.fmt}"
+
+
+class BlobStore:
+    def __init__(self, root: str = BLOB_STORE_DIR,
+                 session_max_bytes: int = BLOB_SESSION_MAX_BYTES,
+                 ttl_seconds: float = BLOB_TTL_SECONDS):
+        self.root = root
+        self.session_max_bytes = session_max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+
+    def _session_dir(self, session: str) -> str:
+        return os.path.join(self.root, session)
+
+    def path(self, ref: BlobRef) -> str:
+        return os.path.join(self._session_dir(ref.session), ref.filename)
+
+    def put(self, session: str, data: bytes, fmt: Optional[str] = None) -> Optional[BlobRef]:
+        if not data:
+            return None
+        ref = BlobRef(session, hashlib.sha256(data).hexdigest(), fmt or audio_format(data), len(data))
+        path = self.path(ref)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not os.path.exists(path):
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            else:
+                os.utime(path)
+            os.utime(os.path.dirname(path))  # 세션 마지막 사용 시각 (TTL 기준)
+        except OSError as e:
+            print(f"blob store write failed: {e}")
+            return None
+        self._enforce_quota(session, keep=ref.filename)
+        self._maybe_cleanup()
+        return ref
+
+    def get(self, ref: Optional[BlobRef]) -> Optional[bytes]:
+        if ref is None:
+            return None
+        path = self.path(ref)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            os.utime(os.path.dirname(path))
+            return data
+        except OSError:
+            return None  # 용량 초과/TTL 로 정리된 경우
+
+    def drop_session(self, session: str) -> None:
+        shutil.rmtree(self._session_dir(session), ignore_errors=True)
+
+    def session_bytes(self, session: str) -> int:
+        try:
+            return sum(e.stat().st_size for e in os.scandir(self._session_dir(session)) if e.is_file())
+        except OSError:
+            return 0
+
+    def _enforce_quota(self, session: str, keep: str) -> None:
+        """세션 용량 상한 초과 시 방금 저장한 파일을 제외하고 오래 안 쓴 파일부터 삭제."""
+        try:
+            entries = [e for e in os.scandir(self._session_dir(session))
+                       if e.is_file() and not e.name.endswith(".tmp")]
+        except OSError:
+            return
+        total = sum(e.stat().st_size for e in entries)
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            if total <= self.session_max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+
+    def _maybe_cleanup(self) -> None:
+        now = time.time()
+        with self._lock:
+            if now - self._last_cleanup < BLOB_CLEANUP_INTERVAL:
+                return
+            self._last_cleanup = now
+        self.cleanup(now)
+
+    def cleanup(self, now: Optional[float] = None) -> None:
+        """마지막 사용 후 TTL 이 지난 세션 폴더 삭제."""
+        now = now or time.time()
+        try:
+            entries = [e for e in os.scandir(self.root) if e.is_dir()]
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if now - entry.stat().st_mtime > self.ttl_seconds:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                pass
+
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """프로세스 전역 blob 저장소."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BlobStore()
+        return _store
+
+
+# ---------------------- Streamlit 세션 헬퍼 ---------------------- #
+def blob_session_id() -> str:
+    session = st.session_state.get("blob_session")
+    if session is None:
+        session = st.session_state["blob_session"] = uuid.uuid4().hex
+    return session
+
+
+def put_blob(data: Optional[bytes], fmt: Optional[str] = None) -> Optional[BlobRef]:
+    """bytes 를 현재 세션 저장소에 넣고 핸들 반환 (세션 상태에는 이 핸들만 저장)."""
+    if not data:
+        return None
+    return get_blob_store().put(blob_session_id(), data, fmt)
+
+
+def load_blob(value: Union[BlobRef, bytes, None]) -> Optional[bytes]:
+    """핸들 → bytes (이전 세션 상태에 남은 bytes 는 그대로 반환)."""
+    if isinstance(value, BlobRef):
+        return get_blob_store().get(value)
+    return value or None
+
+
+def reset_session_blobs() -> None:
+    """새 시험 시작 시 현재 세션의 blob 삭제 (이전 핸들은 load_blob 에서 None)."""
+    session = st.session_state.pop("blob_session", None)
+    if session is not None:
+        get_blob_store().drop_session(session)
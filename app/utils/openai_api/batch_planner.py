@@ -0,0 +1,142 @@
+"""
+채점 배치 플래너 (토큰 기반)
+- 문항별 입력/출력 토큰을 답변 길이와 모범답안 목표 길이(_target_range)로 추정
+- 출력 토큰 예산 안에서 최대한 적은 요청 수로 묶음 (first-fit decreasing)
+- 실제 usage/finish_reason 을 기록해 출력 추정치를 보정 (EMA)
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 요청 1회 출력 토큰 상한 / 배치당 최대 문항 수
+GRADING_MAX_OUTPUT_TOKENS = int(os.getenv("GRADING_MAX_OUTPUT_TOKENS", "4000"))
+GRADING_MAX_BATCH_ITEMS = int(os.getenv("GRADING_MAX_BATCH_ITEMS", "8"))
+# 1 이면 배치 기록/채점 경로 카운터 출력 (comprehensive_tutor 와 공유)
+GRADING_DEBUG = os.getenv("GRADING_DEBUG", "0") == "1"
+
+TOKENS_PER_WORD = 1.4          # 영어 답변/모범답안
+TOKENS_PER_HANGUL_CHAR = 1.0   # 한국어 피드백
+ITEM_FEEDBACK_TOKENS = 160     # 문항별 strengths/improvements + JSON 키
+BATCH_OVERHEAD_OUTPUT = 320    # overall_* / level_description 등
+BATCH_OVERHEAD_INPUT = 700     # 시스템 프롬프트 + 프로필
+HEADROOM = 1.25                # max_tokens 여유분
+
+TargetRange = Callable[[str], Tuple[int, int]]
+
+
+@dataclass
+class PlannedBatch:
+    items: List[Dict]
+    est_input_tokens: int
+    est_output_tokens: int
+    max_tokens: int
+    started_at: float = field(default=0.0)
+
+
+def _estimate_text_tokens(text: str) -> int:
+    text = text or ""
+    hangul = sum(1 for ch in text if "가" <= ch <= "힣")
+    words = len(text.split())
+    return int(words * TOKENS_PER_WORD + hangul * TOKENS_PER_HANGUL_CHAR)
+
+
+class GradingBatchPlanner:
+    def __init__(self, max_output_tokens: int = GRADING_MAX_OUTPUT_TOKENS,
+                 max_items: int = GRADING_MAX_BATCH_ITEMS):
+        self.max_output_tokens = max_output_tokens
+        self.max_items = max(1, max_items)
+        self._lock = threading.Lock()
+        self._output_ratio = 1.0  # 실제/추정 출력 토큰 비율 (EMA)
+        self._history: List[Dict] = []
+
+    # ---------- 추정 ----------
+    def estimate_item(self, item: Dict, target_range: TargetRange) -> Tuple[int, int]:
+        """(입력 토큰, 출력 토큰) 추정. target_range: 답변 → 모범답안 목표 단어 수 (min, max)."""
+        in_tokens = _estimate_text_tokens(item.get("question", "")) + _estimate_text_tokens(item.get("answer", "")) + 20
+        _, tmax = target_range(item.get("answer", ""))
+        out_tokens = int(tmax * TOKENS_PER_WORD) + ITEM_FEEDBACK_TOKENS
+        with self._lock:
+            out_tokens = int(out_tokens * self._output_ratio)
+        return in_tokens, out_tokens
+
+    # ---------- 배치 구성 ----------
+    def plan(self, qa_items: List[Dict], target_range: TargetRange) -> List[PlannedBatch]:
+        budget = self.max_output_tokens / HEADROOM - BATCH_OVERHEAD_OUTPUT
+        estimates = [(item, *self.estimate_item(item, target_range)) for item in qa_items]
+        # 출력이 큰 문항부터 들어갈 수 있는 첫 배치에 배치
+        bins: List[List[Tuple[Dict, int, int]]] = []
+        for est in sorted(estimates, key=lambda e: e[2], reverse=True):
+            for b in bins:
+                if len(b) < self.max_items and sum(e[2] for e in b) + est[2] <= budget:
+                    b.append(est)
+                    break
+            else:
+                bins.append([est])
+
+        plans = []
+        for b in bins:
+            b.sort(key=lambda e: e[0].get("question_num", 0))
+            out_tokens = BATCH_OVERHEAD_OUTPUT + sum(e[2] for e in b)
+            plans.append(PlannedBatch(
+                items=[e[0] for e in b],
+                est_input_tokens=BATCH_OVERHEAD_INPUT + sum(e[1] for e in b),
+                est_output_tokens=out_tokens,
+                max_tokens=min(self.max_output_tokens, int(out_tokens * HEADROOM)),
+            ))
+        plans.sort(key=lambda p: p.items[0].get("question_num", 0))
+        return plans
+
+    # ---------- 실적 기록 ----------
+    def record(self, plan: PlannedBatch, usage, finish_reason: Optional[str], valid_items: int) -> None:
+        """응답 usage 로 추정 오차를 기록하고, 출력 토큰 비율을 EMA 로 보정."""
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        entry = {
+            "items": len(plan.items),
+            "valid_items": valid_items,
+            "est_input_tokens": plan.est_input_tokens,
+            "est_output_tokens": plan.est_output_tokens,
+            "max_tokens": plan.max_tokens,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "finish_reason": finish_reason,
+            "latency_s": round(time.time() - plan.started_at, 2) if plan.started_at else None,
+        }
+        with self._lock:
+            self._history.append(entry)
+            del self._history[:-200]
+            if completion_tokens:
+                observed = completion_tokens / max(1, plan.est_output_tokens)
+                if finish_reason == "length":
+                    observed *= HEADROOM  # 잘린 응답은 실제 필요량이 더 큼
+                ratio = self._output_ratio * 0.8 + (self._output_ratio * observed) * 0.2
+                self._output_ratio = max(0.5, min(2.0, ratio))
+        if GRADING_DEBUG:
+            print("[batch plan]", entry)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            history = list(self._history)
+            ratio = self._output_ratio
+        truncated = sum(1 for h in history if h["finish_reason"] == "length")
+        return {
+            "batches": len(history),
+            "truncated": truncated,
+            "incomplete": sum(1 for h in history if h["valid_items"] < h["items"]),
+            "output_ratio": round(ratio, 3),
+        }
+
+
+# 보정치(출력 토큰 비율)를 요청 간에 유지하도록 프로세스 전역으로 공유
+_planner: Optional[GradingBatchPlanner] = None
+_planner_lock = threading.Lock()
+
+
+def get_batch_planner() -> GradingBatchPlanner:
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            _planner = GradingBatchPlanner()
+        return _planner
@@ -0,0 +1,117 @@
+"""
+프로세스 전역 OpenAI 클라이언트 제공자
+- 동기 OpenAI 클라이언트 1개를 모든 스레드가 공유 (httpx 커넥션 풀/keep-alive 재사용 → TLS 핸드셰이크 절약)
+- 비동기 클라이언트는 이벤트 루프마다 1개 (비동기 HTTP 클라이언트는 생성된 루프에 묶임;
+  스레드에서 asyncio.run 을 쓰는 경우 루프 종료 전에 close_async_openai_client() 호출)
+- 풀 크기/keep-alive/타임아웃/재시도는 환경변수로 조정
+- fork 된 자식 프로세스는 부모 소켓을 공유하지 않도록 새로 생성 (db.db 와 동일)
+- HTTP 클라이언트는 SDK 의 DefaultHttpxClient/DefaultAsyncHttpxClient 로 생성
+  (Limits/Timeout 도 SDK 가 쓰는 HTTP 패키지의 것을 사용 → httpx 를 직접 의존하지 않음)
+"""
+import asyncio
+import os
+import threading
+import weakref
+from typing import Optional
+
+from dotenv import load_dotenv
+from openai import (
+    DEFAULT_CONNECTION_LIMITS, AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI, Timeout,
+)
+
+load_dotenv()
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "10"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))
+# 재시도/백오프는 scheduler.LLMScheduler 가 담당 (SDK 자체 재시도와 중복 방지)
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "0"))
+
+_lock = threading.Lock()
+_sync_client: Optional[OpenAI] = None
+_sync_pid: Optional[int] = None
+# 이벤트 루프 → AsyncOpenAI (루프가 사라지면 항목도 사라짐)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+
+def _reset_after_fork():
+    global _lock, _sync_client, _sync_pid
+    _lock = threading.Lock()
+    _sync_client = None
+    _sync_pid = None
+    _async_clients.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# SDK 가 사용하는 HTTP 패키지의 Limits 클래스
+_Limits = type(DEFAULT_CONNECTION_LIMITS)
+
+
+def _limits():
+    return _Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> Timeout:
+    return Timeout(OPENAI_READ_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+
+
+def has_api_key() -> bool:
+    return bool(os.getenv("OPENAI_API_KEY"))
+
+
+def get_openai_client() -> OpenAI:
+    """공유 동기 클라이언트 (지연 생성). API 키가 없으면 OpenAI 생성자 예외가 그대로 전달됨."""
+    global _sync_client, _sync_pid
+    with _lock:
+        if _sync_client is None or _sync_pid != os.getpid():
+            _sync_client = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=OPENAI_MAX_RETRIES,
+                timeout=_timeout(),
+                http_client=DefaultHttpxClient(limits=_limits(), timeout=_timeout()),
+            )
+            _sync_pid = os.getpid()
+        return _sync_client
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """현재 실행 중인 이벤트 루프 전용 비동기 클라이언트 (루프 안에서만 호출)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=OPENAI_MAX_RETRIES,
+                timeout=_timeout(),
+                http_client=DefaultAsyncHttpxClient(limits=_limits(), timeout=_timeout()),
+            )
+            _async_clients[loop] = client
+        return client
+
+
+async def close_async_openai_client() -> None:
+    """현재 루프의 비동기 클라이언트 정리 (asyncio.run 으로 만든 단명 루프 종료 직전에 호출)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.close()
+
+
+def close_openai_client() -> None:
+    """공유 동기 클라이언트 정리 (테스트/종료 시)."""
+    global _sync_client, _sync_pid
+    with _lock:
+        client, _sync_client, _sync_pid = _sync_client, None, None
+    if client is not None:
+        client.close()
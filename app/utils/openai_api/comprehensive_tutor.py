@@ -1,23 +1,48 @@
 """
 OPIc 9단계 레벨 시스템 기반 종합 피드백 튜터 (안정화 + 동적 길이 버전)
-- 전 문항 채점 보장: 배치 처리 + 누락 문항 개별 보정
+- 전 문항 채점 보장: 배치 처리 + 누락 문항 개별 보정 (배치/보정 모두 동시 요청)
 - JSON 깨짐 자동 복구(safe_json_loads)
 - 무응답만 0점(하드가드), 답변이 있으면 길이별 점수 하한 적용
 - fallback 점수 분산(전부 50점 문제 해소)
-- 모범답안은 '사용자 원문 길이'에 맞춰 동적 생성 (원문>80단어면 절대 축소 금지)
+- 모범답안은 '사용자 원문 길이'에 맞춰 동적 생성 (원문>80단어면 절대 축소 금지, JSON 일괄 재작성)
 """
 import os
 import json
 import re
 import random
-from typing import Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from app.utils.openai_api.batch_planner import GRADING_DEBUG, GradingBatchPlanner, PlannedBatch, get_batch_planner
+from app.utils.openai_api.client_provider import get_openai_client
+from app.utils.openai_api.grading_cache import GradingCache, get_grading_cache, grading_cache_key
+from app.utils.openai_api.grading_schema import (
+    ItemFeedback, batch_response_format, get_grading_stats, item_response_format, parse_batch_feedback,
+)
+from app.utils.openai_api.local_scorer import LocalProvisionalScorer, get_local_scorer, score_to_level
+from app.utils.openai_api.scheduler import PRIORITY_NORMAL, get_llm_scheduler
 
 load_dotenv()
 
 HANGUL_RE = re.compile(r"[ㄱ-ㅎ가-힣]")
 
+GRADING_MODEL = "gpt-4o-mini"
+# 채점/모범답안 프롬프트를 바꾸면 올려서 채점 캐시 무효화
+GRADING_PROMPT_VERSION = f"v2:{GRADING_MODEL}"
+
+# 동시 채점 요청 수 (배치 채점/누락 보정 공통)
+GRADING_MAX_WORKERS = int(os.getenv("GRADING_MAX_WORKERS", "6"))
+# 채점 호출 1회의 허용 시간(대기 + 재시도 포함, 초)
+GRADING_CALL_DEADLINE = float(os.getenv("GRADING_CALL_DEADLINE", "90"))
+
+# LLM 점수가 로컬 잠정 점수에서 이 폭 이상 벗어나면 이상치로 표시 (점수는 LLM 값 유지)
+SCORE_SANITY_BAND = int(os.getenv("SCORE_SANITY_BAND", "30"))
+
+T = TypeVar("T")
+R = TypeVar("R")
+
 # ---------------------- 유틸 ---------------------- #
 def _contains_hangul(text: str) -> bool:
     return bool(HANGUL_RE.search(text or ""))
@@ -27,20 +52,41 @@ def _word_count(text: str) -> int:
 
 
 class ComprehensiveOPIcTutor:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(self, max_workers: int = GRADING_MAX_WORKERS, cache: Optional[GradingCache] = None,
+                 local_scorer: Optional[LocalProvisionalScorer] = None,
+                 batch_planner: Optional[GradingBatchPlanner] = None,
+                 priority: int = PRIORITY_NORMAL):
+        self.client = get_openai_client()
+        self.max_workers = max(1, max_workers)
+        self.cache = cache if cache is not None else get_grading_cache()
+        self.local_scorer = local_scorer if local_scorer is not None else get_local_scorer()
+        self.batch_planner = batch_planner if batch_planner is not None else get_batch_planner()
+        self.priority = priority
+        self.scheduler = get_llm_scheduler()
+
+    # ---------- LLM 호출 (중앙 스케줄러 경유: 속도 제한·재시도·서킷 브레이커) ----------
+    def _chat(self, **kwargs):
+        return self.scheduler.call("chat", lambda: self.client.chat.completions.create(**kwargs),
+                                   priority=self.priority, deadline=GRADING_CALL_DEADLINE)
+
+    # ---------- 채점 캐시 ----------
+    def _item_cache_key(self, question: str, answer: str, user_profile: Dict) -> str:
+        return grading_cache_key(question, answer, user_profile, GRADING_PROMPT_VERSION)
+
+    def _exam_cache_key(self, all_qa: List[Dict], user_profile: Dict) -> str:
+        item_keys = [self._item_cache_key(x["question"], x["answer"], user_profile) for x in all_qa]
+        return grading_cache_key("\n".join(item_keys), "", None, f"exam:{GRADING_PROMPT_VERSION}")
+
+    # ---------- 동시 실행 (입력 순서대로 결과 반환) ----------
+    def _map_concurrent(self, fn: Callable[[T], R], items: List[T]) -> List[R]:
+        if len(items) <= 1:
+            return [fn(x) for x in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return list(pool.map(fn, items))
 
     # ---------- 레벨 매핑(9단계) ----------
     def _score_to_level(self, score: int) -> str:
-        if score >= 93: return "AL (Advanced Low)"
-        if score >= 88: return "IH (Intermediate High)"
-        if score >= 83: return "IM3 (Intermediate Mid 3)"
-        if score >= 78: return "IM2 (Intermediate Mid 2)"
-        if score >= 73: return "IM1 (Intermediate Mid 1)"
-        if score >= 61: return "IL (Intermediate Low)"
-        if score >= 46: return "NH (Novice High)"
-        if score >= 31: return "NM (Novice Mid)"
-        return "NL (Novice Low)"
+        return score_to_level(score)
 
     # ---------- 하한 점수(답변 길이 기반) ----------
     def _min_floor_by_length(self, answer: str) -> int:
@@ -57,6 +103,7 @@ class ComprehensiveOPIcTutor:
         try:
             return json.loads(s)
         except Exception:
+            get_grading_stats().incr("json_repairs")
             s2 = (s or "").strip()
             s2 = s2.replace("```json", "").replace("```", "").strip()
             # 단순 괄호 복구
@@ -67,33 +114,64 @@ class ComprehensiveOPIcTutor:
             return json.loads(s2)
 
     # ---------- 샘플답안 보정 (동적 길이) ----------
-    def _fix_sample_answer(self, question: str, user_answer: str, sample_answer: str) -> str:
+    def _target_range(self, user_answer: str):
         """
         모범답안 길이를 '사용자 원문'에 맞춰 동적으로 조정:
         - 무응답: 60~80 단어
         - 원문 ≤ 80단어: 60~90 단어
         - 81~130단어: [원문, 원문*1.15] (최대 140)
         - 130단어 초과: [원문, 원문*1.10] (최대 180)
-        또한 '원문이 80+ 단어면 절대 원문보다 짧지 않게' 재작성.
         """
-        def _target_range(user_len: int):
-            if user_answer == "무응답":
-                return (60, 80)
-            if user_len <= 80:
-                return (max(60, user_len), 90)
-            if user_len <= 130:
-                return (user_len, min(int(user_len * 1.15), 140))
-            return (user_len, min(int(user_len * 1.10), 180))
+        user_len = _word_count(user_answer or "")
+        if user_answer == "무응답":
+            return (60, 80)
+        if user_len <= 80:
+            return (max(60, user_len), 90)
+        if user_len <= 130:
+            return (user_len, min(int(user_len * 1.15), 140))
+        return (user_len, min(int(user_len * 1.10), 180))
+
+    def _needs_sample_rewrite(self, user_answer: str, sample_answer: str) -> bool:
+        tmin, tmax = self._target_range(user_answer)
+        wc = _word_count(sample_answer or "")
+        needs_rewrite = _contains_hangul(sample_answer) or wc < tmin or wc > tmax or not sample_answer
+        return needs_rewrite or _contains_hangul(user_answer)
+
+    def _adjust_sample_length(self, fixed: str, tmin: int, tmax: int) -> str:
+        """LLM 결과 후처리: 한글 제거 + tmin~tmax 범위로 로컬 trim/extend."""
+        fixed = (fixed or "").strip()
+        if _contains_hangul(fixed):
+            fixed = re.sub(HANGUL_RE, "", fixed).strip()
+
+        wc2 = _word_count(fixed)
+        if wc2 > tmax:
+            sentences = re.split(r"(?<=[.!?])\s+", fixed)
+            while _word_count(" ".join(sentences)) > tmax and len(sentences) > 3:
+                sentences.pop()
+            fixed = " ".join(sentences)
+        elif wc2 < tmin:
+            fixed += " Additionally, I added a concrete example and a brief takeaway so the story feels complete and consistent with my original answer."
+        return fixed
+
+    def _fallback_sample_answer(self, user_answer: str) -> str:
+        # 실패 시: 원문 기반 간단 문단 + 동적 길이 하한 보정
+        base = re.sub(HANGUL_RE, "", (user_answer or "")).strip()
+        if not base:
+            base = "I would present a clear beginning, a specific example, and a short conclusion."
+        return (
+            f"{base} For example, I explain when it happened and what I did. "
+            f"Additionally, I describe what I learned so the story remains detailed and aligned with my original intent."
+        )
 
+    def _fix_sample_answer(self, question: str, user_answer: str, sample_answer: str) -> str:
+        """
+        모범답안 1개를 '사용자 원문' 길이에 맞춰 재작성 (_target_range 참고).
+        또한 '원문이 80+ 단어면 절대 원문보다 짧지 않게' 재작성.
+        """
         u_wc = _word_count(user_answer or "")
-        tmin, tmax = _target_range(u_wc)
-
-        needs_english = _contains_hangul(sample_answer)
-        wc = _word_count(sample_answer or "")
-        needs_length = wc < tmin or wc > tmax
-        needs_rewrite = needs_english or needs_length or not sample_answer
+        tmin, tmax = self._target_range(user_answer)
 
-        if not needs_rewrite and not _contains_hangul(user_answer):
+        if not self._needs_sample_rewrite(user_answer, sample_answer):
             return sample_answer
 
         system = (
@@ -118,8 +196,8 @@ Original sample_answer (may be empty/short):
 """
 
         try:
-            resp = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            resp = self._chat(
+                model=GRADING_MODEL,
                 temperature=0.3,
                 max_tokens=380,
                 messages=[
@@ -127,51 +205,104 @@ Original sample_answer (may be empty/short):
                     {"role": "user", "content": user},
                 ],
             )
-            fixed = (resp.choices[0].message.content or "").strip()
-            if _contains_hangul(fixed):
-                fixed = re.sub(HANGUL_RE, "", fixed).strip()
-
-            # 사후 길이 보정: tmin~tmax 범위로 맞춤
-            wc2 = _word_count(fixed)
-            if wc2 > tmax:
-                sentences = re.split(r"(?<=[.!?])\s+", fixed)
-                while _word_count(" ".join(sentences)) > tmax and len(sentences) > 3:
-                    sentences.pop()
-                fixed = " ".join(sentences)
-            elif wc2 < tmin:
-                fixed += " Additionally, I added a concrete example and a brief takeaway so the story feels complete and consistent with my original answer."
-            return fixed
+            return self._adjust_sample_length(resp.choices[0].message.content, tmin, tmax)
         except Exception:
-            # 실패 시: 원문 기반 간단 문단 + 동적 길이 하한 보정
-            base = re.sub(HANGUL_RE, "", (user_answer or "")).strip()
-            if not base:
-                base = "I would present a clear beginning, a specific example, and a short conclusion."
-            fallback = (
-                f"{base} For example, I explain when it happened and what I did. "
-                f"Additionally, I describe what I learned so the story remains detailed and aligned with my original intent."
+            return self._fallback_sample_answer(user_answer)
+
+    # ---------- 샘플답안 일괄 보정 (JSON 모드, 요청당 여러 문항) ----------
+    def _rewrite_samples_request(self, jobs: List[Dict]) -> Dict[int, str]:
+        system = (
+            "You are an expert OPIc speaking coach.\n"
+            "For EACH item, rewrite and EXPAND the model answer IN ENGLISH ONLY.\n"
+            "Rules (per item):\n"
+            "- Preserve the user's intent and main ideas; refine grammar, vocabulary, and flow.\n"
+            "- Clear opening–body–conclusion with at least TWO transitions "
+            "(e.g., However, For example, Additionally, As a result).\n"
+            "- Add realistic details that fit the user's answer (no contradictions).\n"
+            "- Respect the item's target_words [min, max]. If the user's answer is long, DO NOT shorten below the user's length.\n"
+            'Output JSON only: {"answers": [{"id": <int>, "sample_answer": "<one paragraph>"}]} '
+            "with exactly one entry per input id."
+        )
+        payload = {"items": [{
+            "id": j["id"],
+            "question": j["question"],
+            "user_answer": j["user_answer"] or "(empty/very short)",
+            "user_answer_words": _word_count(j["user_answer"] or ""),
+            "original_sample_answer": j["sample_answer"] or "(empty)",
+            "target_words": [j["tmin"], j["tmax"]],
+        } for j in jobs]}
+        try:
+            resp = self._chat(
+                model=GRADING_MODEL,
+                temperature=0.3,
+                max_tokens=min(4000, 80 + sum(int(j["tmax"] * 1.6) + 20 for j in jobs)),
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+                ],
             )
-            return fallback
+            data = self._safe_json_loads(resp.choices[0].message.content)
+            return {int(a["id"]): str(a.get("sample_answer", ""))
+                    for a in data.get("answers", []) if isinstance(a, dict) and "id" in a}
+        except Exception as e:
+            print("[sample batch error]", e)
+            return {}
+
+    def _fix_sample_answers_batch(self, items: List[Dict], batch_size: int = 8) -> List[str]:
+        """
+        items: [{"question", "user_answer", "sample_answer"}] → 보정된 sample_answer 리스트(같은 순서).
+        - 보정이 필요한 문항만 batch_size개씩 묶어 JSON 모드로 동시 요청
+        - 로컬 trim/extend 후에도 길이 범위를 벗어나거나 응답에서 빠진 문항만 개별 호출로 재시도
+        """
+        results = [it.get("sample_answer", "") for it in items]
+        jobs = []
+        for idx, it in enumerate(items):
+            if self._needs_sample_rewrite(it["user_answer"], it.get("sample_answer", "")):
+                tmin, tmax = self._target_range(it["user_answer"])
+                jobs.append({"id": idx, "question": it["question"], "user_answer": it["user_answer"],
+                             "sample_answer": it.get("sample_answer", ""), "tmin": tmin, "tmax": tmax})
+        if not jobs:
+            return results
+
+        rewritten: Dict[int, str] = {}
+        for part in self._map_concurrent(self._rewrite_samples_request, list(self._chunks(jobs, batch_size))):
+            rewritten.update(part)
+
+        retry = []
+        for job in jobs:
+            fixed = self._adjust_sample_length(rewritten.get(job["id"], ""), job["tmin"], job["tmax"])
+            if rewritten.get(job["id"]) and job["tmin"] <= _word_count(fixed) <= job["tmax"]:
+                results[job["id"]] = fixed
+            else:
+                retry.append(job)
+
+        fixed_singles = self._map_concurrent(
+            lambda j: self._fix_sample_answer(j["question"], j["user_answer"], j["sample_answer"]), retry
+        )
+        for job, fixed in zip(retry, fixed_singles):
+            results[job["id"]] = fixed
+        return results
 
     # ---------- 공통 시스템 프롬프트(배치 채점) ----------
     def _build_system_prompt(self, n_items: int, question_nums: List[int]) -> str:
         return (
             "너는 OPIc 말하기 시험 전문 채점관이다. 피드백/설명은 한국어, sample_answer는 영어만 작성한다.\n"
             f"- 이번 배치 문항 수: {n_items}, question_num 목록: {question_nums}\n"
-            "- individual_feedback 항목 수는 입력 문항 수와 정확히 동일해야 한다(누락·중복 금지).\n\n"
+            "- individual_feedback 은 \"q<question_num>\" 키마다 항목 하나씩, 입력 문항 수와 정확히 동일해야 한다(누락·중복 금지).\n\n"
             "출력(JSON only):\n"
             "{\n"
             '  "overall_score": <0~100 int>,\n'
             '  "opic_level": "<AL/IH/IM3/IM2/IM1/IL/NH/NM/NL>",\n'
             '  "level_description": "한국어로, 반드시 opic_level 값과 동일한 등급명을 포함하고, 실제 overall_score와 답변 경향을 반영해 상세하게 작성(예: 강점, 약점, 레벨 근거, 개선 방향 등 포함)",\n'
-            '  "individual_feedback": [\n'
-            "    {\n"
-            '      "question_num": <int>,\n'
+            '  "individual_feedback": {\n'
+            '    "q<question_num>": {\n'
             '      "score": <0~100>,\n'
             '      "strengths": ["한국어"],\n'
             '      "improvements": ["한국어"],\n'
             '      "sample_answer": "영어만, 사용자 답변 기반, 2개 이상 전환어, 길이 규칙 준수"\n'
             "    }\n"
-            "  ],\n"
+            "  },\n"
             '  "overall_strengths": ["한국어"],\n'
             '  "priority_improvements": ["한국어 2~4개"],\n'
             '  "study_recommendations": "한국어"\n'
@@ -184,33 +315,58 @@ Original sample_answer (may be empty/short):
         )
 
     # ---------- 배치 채점 호출 ----------
-    def _grade_batch(self, qa_batch: List[Dict], user_profile: Dict) -> Dict:
-        sys = self._build_system_prompt(len(qa_batch), [x["question_num"] for x in qa_batch])
+    def _grade_batch(self, qa_batch: List[Dict], user_profile: Dict, plan: Optional[PlannedBatch] = None) -> Dict:
+        """
+        strict JSON schema 로 문항 수를 고정해 요청하고, 검증된 항목만 individual_feedback 로 반환.
+        plan: 배치 플래너 결과 — max_tokens 로 쓰고, 실제 usage 를 플래너에 기록.
+        """
+        nums = [x["question_num"] for x in qa_batch]
+        sys = self._build_system_prompt(len(qa_batch), nums)
         payload = {"user_profile": user_profile, "qa": qa_batch}
+        stats = get_grading_stats()
+        stats.incr("batch_requests")
+        stats.incr("batch_items", len(qa_batch))
+        if plan is not None:
+            plan.started_at = time.time()
         try:
-            resp = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            resp = self._chat(
+                model=GRADING_MODEL,
                 temperature=0.2,
-                max_tokens=1600,
-                response_format={"type": "json_object"},
+                max_tokens=plan.max_tokens if plan is not None else 1600,
+                response_format=batch_response_format(nums),
                 messages=[
                     {"role": "system", "content": sys},
                     {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
                 ],
             )
-            raw = resp.choices[0].message.content
-            return self._safe_json_loads(raw)
         except Exception as e:
+            stats.incr("request_errors")
             print("[batch error]", e)
             return {"individual_feedback": []}
 
+        fb = {"individual_feedback": []}
+        finish_reason = resp.choices[0].finish_reason if getattr(resp, "choices", None) else None
+        try:
+            fb, invalid = parse_batch_feedback(self._safe_json_loads(resp.choices[0].message.content), nums)
+            stats.incr("schema_valid", len(fb["individual_feedback"]))
+            stats.incr("schema_invalid", len(invalid))
+        except Exception as e:
+            # max_tokens 에서 잘린 응답(finish_reason == "length")은 대개 여기서 실패
+            stats.incr("parse_errors")
+            print("[batch error]", e)
+        finally:
+            # 파싱 실패도 usage/finish_reason 은 기록 → 잘린 배치로 출력 토큰 비율 보정
+            if plan is not None:
+                self.batch_planner.record(plan, getattr(resp, "usage", None), finish_reason,
+                                          len(fb["individual_feedback"]))
+        return fb
+
     # ---------- 단일 문항 채점(보정용) ----------
     def _grade_single(self, item: Dict, user_profile: Dict) -> Dict:
         sys = (
             "너는 OPIc 말하기 시험 전문 채점관이다. 아래 한 문항에 대해 한국어 피드백 + 영어 모범답안을 JSON으로 출력한다.\n"
             "JSON only:\n"
             "{\n"
-            '  "question_num": <int>,\n'
             '  "score": <0~100>,\n'
             '  "strengths": ["한국어"],\n'
             '  "improvements": ["한국어"],\n'
@@ -222,20 +378,30 @@ Original sample_answer (may be empty/short):
         )
         user = {"user_profile": user_profile, "item": item}
         try:
-            resp = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            resp = self._chat(
+                model=GRADING_MODEL,
                 temperature=0.2,
                 max_tokens=520,
-                response_format={"type": "json_object"},
+                response_format=item_response_format(),
                 messages=[
                     {"role": "system", "content": sys},
                     {"role": "user", "content": json.dumps(user, ensure_ascii=False)},
                 ],
             )
-            return self._safe_json_loads(resp.choices[0].message.content)
         except Exception as e:
+            get_grading_stats().incr("request_errors")
+            print("[single error]", e)
+            return self._fallback_item(item)
+        try:
+            record = ItemFeedback.from_raw(self._safe_json_loads(resp.choices[0].message.content), item["question_num"])
+        except Exception as e:
+            get_grading_stats().incr("parse_errors")
             print("[single error]", e)
             return self._fallback_item(item)
+        if record is None:
+            get_grading_stats().incr("schema_invalid")
+            return self._fallback_item(item)
+        return record.to_dict()
 
     # ---------- 누락 보정 ----------
     def _ensure_full_coverage(self, qa_batch: List[Dict], fb: Dict, user_profile: Dict) -> Dict:
@@ -245,12 +411,15 @@ Original sample_answer (may be empty/short):
         want_nums = [x["question_num"] for x in qa_batch]
 
         missing = [n for n in want_nums if n not in got_by_num]
-        for num in missing:
-            item = next(x for x in qa_batch if x["question_num"] == num)
-            repaired = self._grade_single(item, user_profile)
+        missing_items = [next(x for x in qa_batch if x["question_num"] == num) for num in missing]
+        if missing:
+            get_grading_stats().incr("coverage_repairs", len(missing))
+        # 누락 문항은 동시에 개별 채점
+        repaired_items = self._map_concurrent(lambda it: self._grade_single(it, user_profile), missing_items)
+        for item, repaired in zip(missing_items, repaired_items):
             if not isinstance(repaired, dict) or "question_num" not in repaired:
                 repaired = self._fallback_item(item)
-            got_by_num[num] = repaired
+            got_by_num[item["question_num"]] = repaired
 
         fb["individual_feedback"] = [got_by_num[n] for n in sorted(got_by_num.keys())]
         return fb
@@ -261,6 +430,7 @@ Original sample_answer (may be empty/short):
             "I usually structure my answer with a brief opening, a concrete example, and a short conclusion. For example, I explain when it happened and what action I took. Additionally, I describe how I felt and what I learned so the story sounds complete.",
             "I try to be concise but specific; however, I always include at least one detail such as time, place, or result. For example, mentioning a small outcome makes the answer more convincing.",
         ]
+        get_grading_stats().incr("fallbacks")
         score = 0 if item.get("answer") == "무응답" else max(45, self._min_floor_by_length(item.get("answer", "")))
         return {
             "question_num": item["question_num"],
@@ -268,6 +438,7 @@ Original sample_answer (may be empty/short):
             "strengths": [] if score == 0 else ["질문 의도에 맞춰 응답함"],
             "improvements": ["구체적 예시 추가", "전환어 사용", "문장 길이 다양화"],
             "sample_answer": sample_pool[0],
+            "_debug_used_fallback": True,
         }
 
     # ---------- 빈/기본 응답 ----------
@@ -288,51 +459,209 @@ Original sample_answer (may be empty/short):
         for i in range(0, len(arr), size):
             yield arr[i:i+size]
 
+    def _normalize_answer(self, answer: str) -> str:
+        return (answer or "").strip() if (answer and answer.strip()) else "무응답"
+
+    # ---------- 단일 문항 채점 (시험 진행 중 백그라운드 채점용) ----------
+    def grade_item(self, question_num: int, question: str, answer: str, user_profile: Dict) -> Dict:
+        """한 문항을 채점하고 모범답안까지 보정해 individual_feedback 항목 하나를 반환."""
+        item = {"question_num": question_num, "question": question, "answer": self._normalize_answer(answer)}
+        key = self._item_cache_key(question, item["answer"], user_profile)
+        cached = self.cache.get(key)
+        if cached is not None:
+            cached["question_num"] = question_num
+            return cached
+        graded = self._grade_single(item, user_profile)
+        if not isinstance(graded, dict) or "question_num" not in graded:
+            graded = self._fallback_item(item)
+        graded["question_num"] = question_num
+        graded["sample_answer"] = self._fix_sample_answers_batch([{
+            "question": question, "user_answer": item["answer"], "sample_answer": graded.get("sample_answer", ""),
+        }])[0]
+        if not graded.get("_debug_used_fallback"):
+            self.cache.set(key, graded)
+        return graded
+
+    # ---------- 종합 평가만 생성 (모든 문항이 미리 채점된 경우) ----------
+    def _summarize_overall(self, all_qa: List[Dict], individual: List[Dict], user_profile: Dict) -> Dict:
+        sys = (
+            "너는 OPIc 말하기 시험 전문 채점관이다. 문항별 채점 결과를 종합해 한국어로 총평을 작성한다.\n"
+            "JSON only:\n"
+            "{\n"
+            '  "level_description": "한국어로, 실제 점수와 답변 경향을 반영해 상세하게 작성(강점, 약점, 레벨 근거, 개선 방향)",\n'
+            '  "overall_strengths": ["한국어"],\n'
+            '  "priority_improvements": ["한국어 2~4개"],\n'
+            '  "study_recommendations": "한국어"\n'
+            "}"
+        )
+        by_num = {x["question_num"]: x for x in all_qa}
+        payload = {"user_profile": user_profile, "graded": [{
+            "question_num": it.get("question_num"),
+            "question": by_num.get(it.get("question_num"), {}).get("question", ""),
+            "answer": by_num.get(it.get("question_num"), {}).get("answer", ""),
+            "score": it.get("score"),
+            "strengths": it.get("strengths", []),
+            "improvements": it.get("improvements", []),
+        } for it in individual]}
+        try:
+            resp = self._chat(
+                model=GRADING_MODEL,
+                temperature=0.2,
+                max_tokens=700,
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": sys},
+                    {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+                ],
+            )
+            return self._safe_json_loads(resp.choices[0].message.content)
+        except Exception as e:
+            print("[summary error]", e)
+            return {}
+
+    # ---------- 점수 하드가드 ----------
+    def _apply_score_guard(self, item: Dict, orig: Dict, provisional: Optional[int] = None) -> None:
+        # 무응답만 0점
+        if orig["answer"] == "무응답":
+            item["score"] = 0
+            item["strengths"] = []
+            item.setdefault("improvements", ["질문에 답변하기", "개인 경험 포함하기", "구체적인 세부사항 제공"])
+        else:
+            # LLM 점수가 없거나 숫자가 아니면 로컬 잠정 점수로 대체
+            try:
+                cur = int(item["score"])
+            except (KeyError, TypeError, ValueError):
+                cur = provisional if provisional is not None else 0
+                item["score"] = cur
+                item["_debug_score_source"] = "local"
+            # 로컬 잠정 점수 밴드를 벗어난 이상치는 표시만 (LLM 점수 유지)
+            if (provisional is not None and not item.get("_debug_used_fallback")
+                    and abs(cur - provisional) > SCORE_SANITY_BAND):
+                if not item.get("_debug_score_outlier"):
+                    get_grading_stats().incr("score_outliers")
+                item["_debug_score_outlier"] = True
+                item["_debug_provisional_score"] = provisional
+            # 답변이 있는데 0점 또는 하한 미만이면 보정
+            floor = self._min_floor_by_length(orig["answer"])
+            if cur < floor:
+                item["score"] = floor
+
+    # ---------- 배치 1개 완결 처리: 채점 → 누락 보정 → 하드가드 → 모범답안 보정 → 캐시 ----------
+    def _grade_batch_complete(self, batch: List[Dict], user_profile: Dict,
+                              provisional: Optional[Dict[int, int]] = None,
+                              plan: Optional[PlannedBatch] = None) -> Dict:
+        fb = self._ensure_full_coverage(batch, self._grade_batch(batch, user_profile, plan), user_profile)
+        by_num = {x["question_num"]: x for x in batch}
+        items = [it for it in fb["individual_feedback"] if it.get("question_num") in by_num]
+        for item in items:
+            self._apply_score_guard(item, by_num[item["question_num"]],
+                                    (provisional or {}).get(item["question_num"]))
+
+        # 모범답안 동적 길이 보정 (일괄 요청, 범위 이탈 문항만 개별 재시도)
+        fixed_samples = self._fix_sample_answers_batch([{
+            "question": by_num[it["question_num"]]["question"],
+            "user_answer": by_num[it["question_num"]]["answer"],
+            "sample_answer": it.get("sample_answer", ""),
+        } for it in items])
+        for item, fixed in zip(items, fixed_samples):
+            item["sample_answer"] = fixed
+            orig = by_num[item["question_num"]]
+            if not item.get("_debug_used_fallback"):
+                self.cache.set(self._item_cache_key(orig["question"], orig["answer"], user_profile), item)
+        fb["individual_feedback"] = items
+        return fb
+
     # ---------- 메인 엔드포인트 ----------
-    def get_comprehensive_feedback(self, questions: List[str], answers: List[str], user_profile: Dict) -> Dict:
+    def get_comprehensive_feedback(self, questions: List[str], answers: List[str], user_profile: Dict,
+                                   pregraded: Optional[Dict[int, Dict]] = None) -> Dict:
+        """
+        pregraded: {question_num: individual_feedback 항목} — 시험 중 미리 채점된 문항(grade_item 결과).
+        해당 문항은 다시 채점하지 않고, 나머지만 채점한 뒤 종합 평가를 작성.
+        """
+        result = self._empty_feedback()
+        for event in self.iter_comprehensive_feedback(questions, answers, user_profile, pregraded):
+            if event["type"] == "result":
+                result = event["feedback"]
+        return result
+
+    def iter_comprehensive_feedback(self, questions: List[str], answers: List[str], user_profile: Dict,
+                                    pregraded: Optional[Dict[int, Dict]] = None) -> Iterator[Dict]:
+        """
+        get_comprehensive_feedback 의 스트리밍 버전. 채점이 끝나는 대로 이벤트를 yield:
+        - {"type": "item", "item": <individual_feedback 항목>, "done": <완료 수>, "total": <전체 수>}
+          (미리 채점/캐시된 문항이 먼저, 나머지는 배치가 끝나는 순서대로)
+        - 마지막에 {"type": "result", "feedback": <get_comprehensive_feedback 과 같은 dict>}
+        """
         # 0) 전체 QA 구성
         all_qa = [{"question_num": i + 1,
                    "question": q,
-                   "answer": (a or "").strip() if (a and a.strip()) else "무응답"}
+                   "answer": self._normalize_answer(a)}
                   for i, (q, a) in enumerate(zip(questions, answers))]
+        total = len(all_qa)
 
         if not all_qa:
-            return self._empty_feedback()
-
-        # 1) 배치로 채점 시도 (4개 단위 추천)
-        merged_feedback = {"individual_feedback": []}
-        for batch in self._chunks(all_qa, 4):
-            fb = self._grade_batch(batch, user_profile)
-            fb = self._ensure_full_coverage(batch, fb, user_profile)
-            merged_feedback["individual_feedback"].extend(fb["individual_feedback"])
-
-        # 2) 점수 하드가드 + 모범답안 동적 길이 보정
-        for item in merged_feedback["individual_feedback"]:
-            qn = item.get("question_num")
-            orig = next((x for x in all_qa if x["question_num"] == qn), {"question": "", "answer": "무응답"})
-            # 무응답만 0점
-            if orig["answer"] == "무응답":
-                item["score"] = 0
-                item["strengths"] = []
-                item.setdefault("improvements", ["질문에 답변하기", "개인 경험 포함하기", "구체적인 세부사항 제공"])
-            else:
-                # 답변이 있는데 0점 또는 하한 미만이면 보정
-                try:
-                    cur = int(item.get("score", 0))
-                except Exception:
-                    cur = 0
-                floor = self._min_floor_by_length(orig["answer"])
-                if cur < floor:
-                    item["score"] = floor
-            # 모범답안 동적 길이 보정
-            item["sample_answer"] = self._fix_sample_answer(orig["question"], orig["answer"], item.get("sample_answer", ""))
+            yield {"type": "result", "feedback": self._empty_feedback()}
+            return
+
+        # 같은 질문/답변/프로필이면 전체 결과를 그대로 반환 (토큰 0)
+        exam_key = self._exam_cache_key(all_qa, user_profile)
+        cached_exam = self.cache.get(exam_key)
+        if cached_exam is not None:
+            for done, item in enumerate(cached_exam.get("individual_feedback", []), 1):
+                yield {"type": "item", "item": item, "done": done, "total": total}
+            yield {"type": "result", "feedback": cached_exam}
+            return
+
+        # 로컬 잠정 점수 (LLM 점수 이상치 표시 / 점수 누락 시 대체용)
+        local = self.local_scorer.score([x["question"] for x in all_qa], [x["answer"] for x in all_qa])
+        provisional = {x["question_num"]: s for x, s in zip(all_qa, local["scores"])}
+
+        reused = {x["question_num"]: dict(pregraded[x["question_num"]])
+                  for x in all_qa if pregraded and x["question_num"] in pregraded}
+        # 문항 단위 캐시 적중분도 재채점하지 않음
+        for x in all_qa:
+            if x["question_num"] in reused:
+                continue
+            cached = self.cache.get(self._item_cache_key(x["question"], x["answer"], user_profile))
+            if cached is not None:
+                cached["question_num"] = x["question_num"]
+                reused[x["question_num"]] = cached
+        to_grade = [x for x in all_qa if x["question_num"] not in reused]
+
+        graded: List[Dict] = []
+        for item in reused.values():
+            self._apply_score_guard(item, next(x for x in all_qa if x["question_num"] == item["question_num"]),
+                                    provisional.get(item["question_num"]))
+            graded.append(item)
+            yield {"type": "item", "item": item, "done": len(graded), "total": total}
+
+        # 1) 토큰 예산 기준으로 배치 구성 — 모든 배치를 동시에 요청, 끝나는 배치부터 바로 전달
+        batches = self.batch_planner.plan(to_grade, self._target_range) if to_grade else []
+        batch_fbs: Dict[int, Dict] = {}
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                futures = {pool.submit(self._grade_batch_complete, plan.items, user_profile, provisional, plan): idx
+                           for idx, plan in enumerate(batches)}
+                for future in as_completed(futures):
+                    fb = future.result()
+                    batch_fbs[futures[future]] = fb
+                    for item in fb["individual_feedback"]:
+                        graded.append(item)
+                        yield {"type": "item", "item": item, "done": len(graded), "total": total}
+
+        merged_feedback = {"individual_feedback": sorted(graded, key=lambda it: it.get("question_num", 0))}
 
         # 3) 전체 점수/레벨 계산
         scores = [int(it.get("score", 0)) for it in merged_feedback["individual_feedback"]]
         overall_score = int(round(sum(scores) / len(scores))) if scores else 0
 
         # 4) 종합 피드백(상위 레벨)도 OpenAI 응답에서 받아오도록 시도
-        # 마지막 배치의 fb에 overall_xxx가 있으면 우선 사용, 없으면 기본값
+        # 배치가 모든 문항을 채점했으면 마지막 배치의 overall_xxx 사용, 없으면 기본값
+        # (미리 채점/캐시된 문항이 하나라도 있으면 남은 배치는 일부 문항뿐 → 전체 문항으로 종합 평가만 따로 요청)
+        if batches and not reused:
+            fb = batch_fbs[len(batches) - 1]
+        else:
+            fb = self._summarize_overall(all_qa, merged_feedback["individual_feedback"], user_profile)
         last_fb = fb if 'overall_score' in locals() and isinstance(fb, dict) else {}
         level_description = None
         overall_strengths = None
@@ -355,7 +684,7 @@ Original sample_answer (may be empty/short):
             opic_level = merged_feedback['opic_level']
         else:
             opic_level = self._score_to_level(overall_score)
-        return {
+        result = {
             "overall_score": overall_score,
             "opic_level": opic_level,
             "level_description": level_description or self._score_to_level(overall_score) + " 등급에 해당하는 답변 경향입니다.",
@@ -364,6 +693,11 @@ Original sample_answer (may be empty/short):
             "priority_improvements": priority_improvements if priority_improvements is not None else ["구체적인 예시 추가", "자연스러운 연결어 사용", "문장 구조 다양화"],
             "study_recommendations": study_recommendations if study_recommendations is not None else "각 답변을 45~60초로 정규화하고, Although/Meanwhile/On top of that 등 다양한 연결어를 섞어 연습하세요.",
         }
+        if level_description and not any(it.get("_debug_used_fallback") for it in result["individual_feedback"]):
+            self.cache.set(exam_key, result)
+        if GRADING_DEBUG:
+            print("[grading stats]", get_grading_stats().snapshot())
+        yield {"type": "result", "feedback": result}
 
 
 # ---------------- 사용 예시 ----------------
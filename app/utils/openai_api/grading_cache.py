@@ -0,0 +1,196 @@
+"""
+채점 결과 캐시 (결정적 키 기반)
+- 키: sha256(정규화된 질문, 정규화된 답변, 프로필 지문, 프롬프트/모델 버전)
+- 크기/TTL 기반 정리
+- 백엔드 교체 가능: memory(프로세스 내) / disk(JSON 파일) / mongo(grading_cache 컬렉션)
+  → GRADING_CACHE_BACKEND 환경변수로 선택
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+GRADING_CACHE_BACKEND = os.getenv("GRADING_CACHE_BACKEND", "memory")
+GRADING_CACHE_DIR = os.getenv("GRADING_CACHE_DIR", os.path.join(ROOT_DIR, "data", "cache", "grading"))
+GRADING_CACHE_TTL = float(os.getenv("GRADING_CACHE_TTL", str(30 * 24 * 3600)))
+GRADING_CACHE_MAX_ENTRIES = int(os.getenv("GRADING_CACHE_MAX_ENTRIES", "5000"))
+
+
+# ---------------------- 키 ---------------------- #
+def _normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def profile_fingerprint(user_profile: Optional[Dict]) -> str:
+    payload = json.dumps(user_profile or {}, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def grading_cache_key(question: str, answer: str, user_profile: Optional[Dict], version: str) -> str:
+    payload = json.dumps([_normalize_text(question).lower(), _normalize_text(answer),
+                          profile_fingerprint(user_profile), version], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------- 백엔드 ---------------------- #
+class GradingCacheBackend(ABC):
+    """get/set 만 구현하면 되는 저장소 인터페이스 (값은 JSON 직렬화 가능한 dict)."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Dict, ttl: float) -> None:
+        ...
+
+
+class MemoryGradingBackend(GradingCacheBackend):
+    def __init__(self, max_entries: int = GRADING_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, raw = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+        return json.loads(raw)
+
+    def set(self, key: str, value: Dict, ttl: float) -> None:
+        raw = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._data[key] = (time.time() + ttl, raw)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class DiskGradingBackend(GradingCacheBackend):
+    def __init__(self, directory: str = GRADING_CACHE_DIR, max_entries: int = GRADING_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if entry.get("expires_at", 0) < time.time():
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(self._path(key))  # 최근 사용 표시 (_prune 이 LRU 순으로 정리)
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def set(self, key: str, value: Dict, ttl: float) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": time.time() + ttl, "value": value}, f, ensure_ascii=False)
+            os.replace(tmp, self._path(key))
+            self._prune()
+        except OSError as e:
+            print(f"grading cache write failed: {e}")
+
+    def _prune(self) -> None:
+        entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class MongoGradingBackend(GradingCacheBackend):
+    """grading_cache 컬렉션 사용 (expires_at TTL 인덱스로 만료 문서 자동 삭제)."""
+
+    def __init__(self, collection_name: str = "grading_cache"):
+        from db.db import get_collection  # MONGO_URI가 필요하므로 지연 임포트
+        self.collection = get_collection(collection_name)
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def get(self, key: str) -> Optional[Dict]:
+        doc = self.collection.find_one({"_id": key}, {"value": 1, "expires_at": 1})
+        if not doc:
+            return None
+        expires_at = doc["expires_at"]
+        if expires_at.tzinfo is None:  # pymongo 기본값은 naive UTC
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at < datetime.now(timezone.utc):
+            return None
+        return doc.get("value")
+
+    def set(self, key: str, value: Dict, ttl: float) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        self.collection.replace_one({"_id": key}, {"_id": key, "value": value, "expires_at": expires_at}, upsert=True)
+
+
+# ---------------------- 캐시 ---------------------- #
+class GradingCache:
+    def __init__(self, backend: GradingCacheBackend, ttl: float = GRADING_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            print(f"grading cache get failed: {e}")
+            return None
+
+    def set(self, key: str, value: Dict) -> None:
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            print(f"grading cache set failed: {e}")
+
+
+def _make_backend(name: str) -> GradingCacheBackend:
+    if name == "disk":
+        return DiskGradingBackend()
+    if name == "mongo":
+        try:
+            return MongoGradingBackend()
+        except Exception as e:
+            print(f"grading cache: mongo backend unavailable ({e}), falling back to memory")
+    return MemoryGradingBackend()
+
+
+_shared_cache: Optional[GradingCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_grading_cache() -> GradingCache:
+    """프로세스 전역 채점 캐시 (GRADING_CACHE_BACKEND 로 백엔드 선택)."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = GradingCache(_make_backend(GRADING_CACHE_BACKEND))
+        return _shared_cache
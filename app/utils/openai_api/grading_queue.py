@@ -0,0 +1,67 @@
+"""
+시험 진행 중 백그라운드 채점 큐
+- "→ Next" 로 확정된 (질문, 답변)을 즉시 ComprehensiveOPIcTutor.grade_item 으로 채점
+- 결과는 문항 번호별로 누적 → 피드백 페이지는 남은 문항과 종합 평가만 처리
+- 답변이 바뀌면(Back 후 재제출) 이전 결과는 버리고 새로 채점
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Optional, Tuple
+
+from app.utils.openai_api.comprehensive_tutor import ComprehensiveOPIcTutor
+from app.utils.openai_api.scheduler import PRIORITY_BACKGROUND
+
+# 세션당 동시 백그라운드 채점 수
+BACKGROUND_GRADING_WORKERS = int(os.getenv("BACKGROUND_GRADING_WORKERS", "2"))
+
+
+class GradingQueue:
+    def __init__(self, user_profile: Dict, tutor: Optional[ComprehensiveOPIcTutor] = None,
+                 max_workers: int = BACKGROUND_GRADING_WORKERS):
+        self.user_profile = user_profile
+        self.tutor = tutor or ComprehensiveOPIcTutor(max_workers=1, priority=PRIORITY_BACKGROUND)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="grading")
+        self._jobs: Dict[int, Tuple[str, str, Future]] = {}
+        self._lock = threading.Lock()
+
+    def _key_answer(self, answer: str) -> str:
+        return self.tutor._normalize_answer(answer)
+
+    def submit(self, question_num: int, question: str, answer: str) -> None:
+        """문항을 채점 큐에 넣음 (같은 질문/답변이 이미 있으면 무시)."""
+        answer = self._key_answer(answer)
+        with self._lock:
+            job = self._jobs.get(question_num)
+            if job is not None and job[0] == question and job[1] == answer:
+                return
+            if job is not None:
+                job[2].cancel()
+            future = self._executor.submit(self.tutor.grade_item, question_num, question, answer, self.user_profile)
+            self._jobs[question_num] = (question, answer, future)
+
+    def collect(self, questions, answers, timeout: float = 0.0) -> Dict[int, Dict]:
+        """
+        현재 (questions, answers)와 일치하는 채점 결과만 {question_num: 결과}로 반환.
+        timeout > 0 이면 진행 중인 채점을 그 시간만큼 기다림 (새로 요청하는 것보다 빠름).
+        """
+        wanted = {i + 1: (q, self._key_answer(a)) for i, (q, a) in enumerate(zip(questions, answers))}
+        with self._lock:
+            matching = {n: job[2] for n, job in self._jobs.items()
+                        if n in wanted and wanted[n] == (job[0], job[1])}
+        pending = [f for f in matching.values() if not f.done()]
+        if pending and timeout > 0:
+            wait(pending, timeout=timeout)
+
+        results = {}
+        for num, future in matching.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                results[num] = future.result()
+        return results
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job[2].done())
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,159 @@
+"""
+채점 응답 구조화 출력 (strict JSON schema)
+- 배치별 문항 수를 스키마로 고정: individual_feedback 를 {"q<번호>": {...}} 객체로 두고 모든 키를 required 로 지정
+  (배열 minItems/maxItems 없이도 누락·중복이 불가능)
+- 응답을 ItemFeedback 레코드로 검증/정규화
+- GradingStats: JSON 복구·누락 보정·fallback 경로가 얼마나 자주 타는지 카운트
+"""
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+OPIC_LEVEL_CODES = ["AL", "IH", "IM3", "IM2", "IM1", "IL", "NH", "NM", "NL"]
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer"},
+        "strengths": _STRING_LIST,
+        "improvements": _STRING_LIST,
+        "sample_answer": {"type": "string"},
+    },
+    "required": ["score", "strengths", "improvements", "sample_answer"],
+    "additionalProperties": False,
+}
+
+
+def item_key(question_num: int) -> str:
+    return f"q{question_num}"
+
+
+def batch_response_format(question_nums: List[int]) -> Dict:
+    """배치 채점용 response_format (question_num 마다 항목 1개 강제)."""
+    keys = [item_key(n) for n in question_nums]
+    schema = {
+        "type": "object",
+        "properties": {
+            "overall_score": {"type": "integer"},
+            "opic_level": {"type": "string", "enum": OPIC_LEVEL_CODES},
+            "level_description": {"type": "string"},
+            "individual_feedback": {
+                "type": "object",
+                "properties": {k: ITEM_SCHEMA for k in keys},
+                "required": keys,
+                "additionalProperties": False,
+            },
+            "overall_strengths": _STRING_LIST,
+            "priority_improvements": _STRING_LIST,
+            "study_recommendations": {"type": "string"},
+        },
+        "required": ["overall_score", "opic_level", "level_description", "individual_feedback",
+                     "overall_strengths", "priority_improvements", "study_recommendations"],
+        "additionalProperties": False,
+    }
+    return {"type": "json_schema", "json_schema": {"name": "opic_batch_feedback", "strict": True, "schema": schema}}
+
+
+def item_response_format() -> Dict:
+    """단일 문항 채점용 response_format."""
+    return {"type": "json_schema", "json_schema": {"name": "opic_item_feedback", "strict": True, "schema": ITEM_SCHEMA}}
+
+
+@dataclass
+class ItemFeedback:
+    question_num: int
+    score: int
+    strengths: List[str] = field(default_factory=list)
+    improvements: List[str] = field(default_factory=list)
+    sample_answer: str = ""
+
+    @classmethod
+    def from_raw(cls, raw: Dict, question_num: int) -> Optional["ItemFeedback"]:
+        """모델 응답 항목 검증. 형식이 맞지 않으면 None."""
+        if not isinstance(raw, dict):
+            return None
+        try:
+            score = int(raw["score"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        strengths, improvements = raw.get("strengths", []), raw.get("improvements", [])
+        if not isinstance(strengths, list) or not isinstance(improvements, list):
+            return None
+        return cls(
+            question_num=question_num,
+            score=max(0, min(100, score)),
+            strengths=[str(s) for s in strengths],
+            improvements=[str(s) for s in improvements],
+            sample_answer=str(raw.get("sample_answer") or ""),
+        )
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def parse_batch_feedback(data: Dict, question_nums: List[int]) -> Tuple[Dict, List[int]]:
+    """
+    배치 응답 → (individual_feedback 가 리스트로 정규화된 fb, 검증 실패/누락 question_num 목록).
+    스키마 모양({"q<n>": {...}})과 기존 리스트 모양 모두 허용.
+    """
+    data = dict(data or {})
+    raw_items = data.get("individual_feedback")
+    by_num: Dict[int, Dict] = {}
+    if isinstance(raw_items, dict):
+        by_num = {n: raw_items.get(item_key(n)) for n in question_nums}
+    elif isinstance(raw_items, list):
+        for it in raw_items:
+            if isinstance(it, dict) and it.get("question_num") in question_nums:
+                by_num.setdefault(it["question_num"], it)
+
+    items, invalid = [], []
+    for n in question_nums:
+        record = ItemFeedback.from_raw(by_num.get(n), n)
+        if record is None:
+            invalid.append(n)
+        else:
+            items.append(record.to_dict())
+    data["individual_feedback"] = items
+    return data, invalid
+
+
+class GradingStats:
+    """채점 경로별 카운터 (스레드 안전)."""
+
+    FIELDS = (
+        "batch_requests",    # 배치 채점 호출 수
+        "batch_items",       # 배치로 요청한 문항 수
+        "schema_valid",      # 스키마 검증을 통과한 문항 수
+        "schema_invalid",    # 응답에 없거나 스키마 검증에 실패한 문항 수
+        "json_repairs",      # _safe_json_loads 가 괄호/코드펜스 복구를 해야 했던 횟수
+        "coverage_repairs",  # 누락/검증 실패로 개별 재채점한 문항 수
+        "fallbacks",         # 로컬 fallback 항목으로 대체된 문항 수
+        "request_errors",    # API 호출 예외 수
+        "parse_errors",      # 응답을 JSON 으로 읽지 못한 횟수 (복구 실패)
+        "score_outliers",    # LLM 점수가 로컬 잠정 점수 밴드를 벗어난 문항 수 (점수는 유지)
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {name: 0 for name in self.FIELDS}
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = {name: 0 for name in self.FIELDS}
+
+
+_stats = GradingStats()
+
+
+def get_grading_stats() -> GradingStats:
+    return _stats
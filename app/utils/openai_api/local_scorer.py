@@ -0,0 +1,155 @@
+"""
+로컬 즉시 채점기 (LLM 없이 수 ms)
+- 전체 답변에 대해 numpy 벡터 연산으로 어휘 특징 계산:
+  단어 수, type/token 비율, 연결어 사용, 문장 길이 분산, 한글 비율, 질문 유사도
+- 특징을 0~100 잠정 점수와 OPIc 레벨로 변환
+- 용도: 피드백 페이지 즉시 표시 + LLM 점수 이상치 검출용 sanity band
+"""
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+NO_ANSWER = "무응답"
+
+WORD_RE = re.compile(r"[A-Za-z']+|[ㄱ-ㅎ가-힣]+")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+HANGUL_CHAR_RE = re.compile(r"[ㄱ-ㅎ가-힣]")
+LETTER_RE = re.compile(r"[A-Za-zㄱ-ㅎ가-힣]")
+
+CONNECTIVES = (
+    "however", "for example", "for instance", "additionally", "in addition", "as a result",
+    "moreover", "furthermore", "therefore", "although", "because", "so that", "meanwhile",
+    "on the other hand", "in fact", "after that", "first", "finally", "also", "since", "while",
+    "on top of that", "overall", "in the end", "besides",
+)
+CONNECTIVE_RE = re.compile(r"\b(" + "|".join(re.escape(c) for c in CONNECTIVES) + r")\b")
+
+STOPWORDS = frozenset(
+    "a an the and or but to of in on at for with about me you your i my is are was were do does did "
+    "what how why when where which who tell describe please can could would some any it that this".split()
+)
+
+# 9단계 레벨 기준 (ComprehensiveOPIcTutor와 공유)
+OPIC_LEVEL_THRESHOLDS = (
+    (93, "AL (Advanced Low)"),
+    (88, "IH (Intermediate High)"),
+    (83, "IM3 (Intermediate Mid 3)"),
+    (78, "IM2 (Intermediate Mid 2)"),
+    (73, "IM1 (Intermediate Mid 1)"),
+    (61, "IL (Intermediate Low)"),
+    (46, "NH (Novice High)"),
+    (31, "NM (Novice Mid)"),
+)
+
+# 특징 가중치 (합 1.0) — 길이가 점수를 가장 잘 설명 (_min_floor_by_length 참고)
+FEATURE_WEIGHTS = {
+    "length": 0.45,
+    "lexical_diversity": 0.15,
+    "connectives": 0.15,
+    "sentence_variety": 0.10,
+    "relevance": 0.15,
+}
+
+
+def score_to_level(score: int) -> str:
+    for threshold, level in OPIC_LEVEL_THRESHOLDS:
+        if score >= threshold:
+            return level
+    return "NL (Novice Low)"
+
+
+def _tokens(text: str) -> List[str]:
+    return [w.lower() for w in WORD_RE.findall(text or "")]
+
+
+class LocalProvisionalScorer:
+    def features(self, questions: List[str], answers: List[str]) -> Dict[str, np.ndarray]:
+        """문항별 특징 벡터 (길이 n 배열들)."""
+        n = len(answers)
+        answers = [a if a and a.strip() and a != NO_ANSWER else "" for a in answers]
+        tokens = [_tokens(a) for a in answers]
+
+        word_count = np.array([len(t) for t in tokens], dtype=float)
+        unique_count = np.array([len(set(t)) for t in tokens], dtype=float)
+        letters = np.array([len(LETTER_RE.findall(a)) for a in answers], dtype=float)
+        hangul = np.array([len(HANGUL_CHAR_RE.findall(a)) for a in answers], dtype=float)
+        connectives = np.array([len(CONNECTIVE_RE.findall(a.lower())) for a in answers], dtype=float)
+
+        # 문장 길이(단어 수) 행렬: n x max_sentences, 빈 칸은 NaN
+        sentence_lengths = [[len(s.split()) for s in SENTENCE_SPLIT_RE.split(a.strip()) if s.strip()] for a in answers]
+        width = max([len(x) for x in sentence_lengths] + [1])
+        sent_matrix = np.full((n, width), np.nan)
+        for i, lens in enumerate(sentence_lengths):
+            sent_matrix[i, :len(lens)] = lens
+        sentence_count = np.sum(~np.isnan(sent_matrix), axis=1).astype(float)
+        with np.errstate(invalid="ignore"):
+            sentence_std = np.where(sentence_count > 1, np.nanstd(np.where(sentence_count[:, None] > 0, sent_matrix, 0), axis=1), 0.0)
+
+        # 질문-답변 bag-of-words 코사인 유사도 (불용어 제외)
+        q_tokens = [[w for w in _tokens(q) if w not in STOPWORDS] for q in questions]
+        a_tokens = [[w for w in t if w not in STOPWORDS] for t in tokens]
+        vocab = {w: j for j, w in enumerate(sorted({w for t in q_tokens + a_tokens for w in t}))}
+        q_mat = np.zeros((n, max(1, len(vocab))))
+        a_mat = np.zeros((n, max(1, len(vocab))))
+        for i in range(n):
+            for w in q_tokens[i] if i < len(q_tokens) else []:
+                q_mat[i, vocab[w]] += 1
+            for w in a_tokens[i]:
+                a_mat[i, vocab[w]] += 1
+        norms = np.linalg.norm(q_mat, axis=1) * np.linalg.norm(a_mat, axis=1)
+        similarity = np.divide(np.sum(q_mat * a_mat, axis=1), norms, out=np.zeros(n), where=norms > 0)
+
+        safe_wc = np.maximum(word_count, 1)
+        return {
+            "word_count": word_count,
+            "type_token_ratio": np.where(word_count > 0, unique_count / safe_wc, 0.0),
+            "connective_rate": np.divide(connectives, np.maximum(sentence_count, 1)),
+            "sentence_length_std": sentence_std,
+            "hangul_ratio": np.divide(hangul, letters, out=np.zeros(n), where=letters > 0),
+            "question_similarity": similarity,
+        }
+
+    def score(self, questions: List[str], answers: List[str]) -> Dict:
+        """
+        Returns {"scores": [int], "levels": [str], "overall_score": int, "opic_level": str,
+                 "features": {name: [float]}} — 무응답은 0점.
+        """
+        if not answers:
+            return {"scores": [], "levels": [], "overall_score": 0, "opic_level": score_to_level(0), "features": {}}
+        f = self.features(questions, answers)
+        wc = f["word_count"]
+
+        parts = {
+            "length": np.clip(wc / 60.0, 0, 1),
+            "lexical_diversity": np.clip((f["type_token_ratio"] - 0.3) / 0.5, 0, 1),
+            "connectives": np.clip(f["connective_rate"] / 0.6, 0, 1),
+            "sentence_variety": np.clip(f["sentence_length_std"] / 6.0, 0, 1),
+            "relevance": np.clip(f["question_similarity"] / 0.3, 0, 1),
+        }
+        raw = sum(FEATURE_WEIGHTS[k] * v for k, v in parts.items())
+        scores = (30 + 65 * raw) * (1 - 0.7 * f["hangul_ratio"])
+
+        # 길이 기반 하한 (ComprehensiveOPIcTutor._min_floor_by_length 와 동일 구간)
+        floor = np.select([wc >= 40, wc >= 20, wc >= 5, wc > 0], [60, 50, 40, 30], default=0)
+        scores = np.where(wc > 0, np.maximum(scores, floor), 0)
+        scores = np.clip(np.rint(scores), 0, 100).astype(int)
+
+        overall = int(round(float(scores.mean())))
+        return {
+            "scores": scores.tolist(),
+            "levels": [score_to_level(int(s)) for s in scores],
+            "overall_score": overall,
+            "opic_level": score_to_level(overall),
+            "features": {k: np.round(v, 4).tolist() for k, v in f.items()},
+        }
+
+
+_scorer: Optional[LocalProvisionalScorer] = None
+
+
+def get_local_scorer() -> LocalProvisionalScorer:
+    global _scorer
+    if _scorer is None:
+        _scorer = LocalProvisionalScorer()
+    return _scorer
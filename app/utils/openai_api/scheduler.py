@@ -0,0 +1,313 @@
+"""
+LLM/TTS/STT 호출 중앙 스케줄러
+- 엔드포인트(chat / tts / stt)별 토큰 버킷(분당 요청 수)과 동시 호출 상한
+- 우선순위 레인: 대기 중인 호출은 (priority, 도착 순서)로 슬롯을 배정
+  (사용자가 기다리는 TTS/STT가 백그라운드 선생성/채점보다 먼저)
+- 일시 오류(429, 5xx, 연결/타임아웃)는 full-jitter 지수 백오프로 재시도 (Retry-After 존중)
+- 호출별 deadline: 대기 + 재시도를 포함한 총 허용 시간
+- 서킷 브레이커: 연속 실패 시 일정 시간 호출 차단 → fallback(캐시/로컬) 또는 LLMUnavailableError
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from openai import APIConnectionError, APIStatusError
+
+T = TypeVar("T")
+
+PRIORITY_INTERACTIVE = 0  # 사용자가 화면에서 기다리는 호출 (문제 음성, STT, 버튼 TTS)
+PRIORITY_NORMAL = 1       # 진행 화면용 호출 (시험 문제 생성, 피드백 채점)
+PRIORITY_BACKGROUND = 2   # 선생성/백그라운드 채점/사전 질문 생성
+
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "8"))
+LLM_DEFAULT_DEADLINE = float(os.getenv("LLM_DEFAULT_DEADLINE", "90"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# 엔드포인트별 (분당 요청 수, 동시 호출 수)
+ENDPOINT_LIMITS = {
+    "chat": (int(os.getenv("LLM_CHAT_RPM", "500")), int(os.getenv("LLM_CHAT_CONCURRENCY", "16"))),
+    "tts": (int(os.getenv("LLM_TTS_RPM", "100")), int(os.getenv("LLM_TTS_CONCURRENCY", "6"))),
+    "stt": (int(os.getenv("LLM_STT_RPM", "100")), int(os.getenv("LLM_STT_CONCURRENCY", "6"))),
+}
+
+
+class LLMUnavailableError(RuntimeError):
+    """서킷이 열려 있거나 deadline 안에 호출하지 못함 (fallback 없음)."""
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = max(rate_per_sec, 1e-6)
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def try_take(self) -> float:
+        """토큰 1개 차감 후 0 반환, 부족하면 다음 토큰까지 남은 초 반환. (호출자가 잠금 보유)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = LLM_BREAKER_THRESHOLD, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True  # half-open: 시험 호출 1개만 통과
+            return True
+
+    def abort_trial(self) -> None:
+        """half-open 시험 호출이 실행되지 못하고 끝난 경우."""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.opened_at is not None
+
+
+class _Endpoint:
+    def __init__(self, name: str, rpm: int, concurrency: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.bucket = TokenBucket(rpm / 60.0, capacity=self.concurrency)
+        self.breaker = CircuitBreaker()
+        self.in_flight = 0
+        self.waiters: list = []
+        self.cond = threading.Condition()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "short_circuited": 0, "deadline_exceeded": 0}
+
+    def acquire(self, priority: int, deadline: float, seq: int) -> None:
+        """우선순위가 가장 높은 대기자부터 슬롯 + 토큰을 얻을 때까지 대기."""
+        ticket = (priority, seq)
+        with self.cond:
+            heapq.heappush(self.waiters, ticket)
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"{self.name}: deadline exceeded while queued")
+                    if self.waiters[0] == ticket and self.in_flight < self.concurrency:
+                        wait = self.bucket.try_take()
+                        if wait == 0:
+                            self.in_flight += 1
+                            return
+                        self.cond.wait(min(wait, remaining))
+                    else:
+                        self.cond.wait(remaining)
+            finally:
+                self.waiters.remove(ticket)
+                heapq.heapify(self.waiters)
+                self.cond.notify_all()
+
+    def release(self) -> None:
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def incr(self, key: str) -> None:
+        with self.cond:
+            self.stats[key] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.cond:
+            return dict(self.stats, in_flight=self.in_flight, waiting=len(self.waiters))
+
+
+def _is_retryable(e: BaseException) -> bool:
+    if isinstance(e, (APIConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    return isinstance(e, APIStatusError) and e.status_code in RETRYABLE_STATUS
+
+
+def _retry_after(e: BaseException) -> Optional[float]:
+    response = getattr(e, "response", None)
+    try:
+        return float(response.headers.get("retry-after")) if response is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMScheduler:
+    def __init__(self, limits: Dict[str, tuple] = None, max_attempts: int = LLM_MAX_ATTEMPTS):
+        self.max_attempts = max(1, max_attempts)
+        self._endpoints = {name: _Endpoint(name, rpm, conc) for name, (rpm, conc) in (limits or ENDPOINT_LIMITS).items()}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _endpoint(self, name: str) -> _Endpoint:
+        with self._lock:
+            if name not in self._endpoints:
+                rpm, conc = ENDPOINT_LIMITS["chat"]
+                self._endpoints[name] = _Endpoint(name, rpm, conc)
+            return self._endpoints[name]
+
+    def _backoff(self, attempt: int, e: BaseException, deadline: float) -> Optional[float]:
+        """다음 시도까지 대기 시간. 재시도 불가/deadline 초과면 None."""
+        if attempt + 1 >= self.max_attempts or not _is_retryable(e):
+            return None
+        delay = _retry_after(e)
+        if delay is None:
+            delay = random.uniform(0, min(LLM_BACKOFF_CAP, LLM_BACKOFF_BASE * (2 ** attempt)))
+        if time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    def _unavailable(self, ep: _Endpoint, reason: str, fallback: Optional[Callable[[], T]]) -> T:
+        if fallback is not None:
+            return fallback()
+        raise LLMUnavailableError(f"{ep.name}: {reason}")
+
+    # ---------- 동기 호출 ----------
+    def call(self, endpoint: str, fn: Callable[[], T], priority: int = PRIORITY_NORMAL,
+             deadline: float = LLM_DEFAULT_DEADLINE, fallback: Optional[Callable[[], T]] = None) -> T:
+        """
+        fn()을 스케줄링해 실행. deadline: 지금부터 허용하는 총 시간(초).
+        서킷이 열렸거나 deadline 안에 끝내지 못하면 fallback() 결과, 없으면 LLMUnavailableError.
+        재시도 불가 오류(400 등)는 그대로 전달.
+        """
+        ep = self._endpoint(endpoint)
+        deadline_at = time.monotonic() + deadline
+        for attempt in range(self.max_attempts):
+            if not ep.breaker.allow():
+                ep.incr("short_circuited")
+                return self._unavailable(ep, "circuit open", fallback)
+            try:
+                ep.acquire(priority, deadline_at, next(self._seq))
+            except TimeoutError:
+                ep.breaker.abort_trial()
+                ep.incr("deadline_exceeded")
+                return self._unavailable(ep, "deadline exceeded", fallback)
+            try:
+                ep.incr("calls")
+                result = fn()
+            except Exception as e:
+                ep.release()
+                if not _is_retryable(e):
+                    # 요청 자체 문제 — 서비스 상태와 무관하므로 실패 누적은 그대로 (half-open 시험 호출만 해제)
+                    ep.breaker.abort_trial()
+                    raise
+                ep.breaker.record_failure()
+                delay = self._backoff(attempt, e, deadline_at)
+                if delay is None:
+                    ep.incr("failures")
+                    if fallback is not None:
+                        return fallback()
+                    raise
+                ep.incr("retries")
+                time.sleep(delay)
+                continue
+            ep.release()
+            ep.breaker.record_success()
+            return result
+        return self._unavailable(ep, "retries exhausted", fallback)
+
+    # ---------- 비동기 호출 ----------
+    async def acall(self, endpoint: str, fn: Callable[[], Awaitable[T]], priority: int = PRIORITY_NORMAL,
+                    deadline: float = LLM_DEFAULT_DEADLINE, fallback: Optional[Callable[[], T]] = None) -> T:
+        """call()의 비동기 버전 (슬롯 대기는 스레드에서, 재시도 대기는 asyncio.sleep)."""
+        ep = self._endpoint(endpoint)
+        deadline_at = time.monotonic() + deadline
+        for attempt in range(self.max_attempts):
+            if not ep.breaker.allow():
+                ep.incr("short_circuited")
+                return self._unavailable(ep, "circuit open", fallback)
+            acquiring = asyncio.ensure_future(asyncio.to_thread(ep.acquire, priority, deadline_at, next(self._seq)))
+            try:
+                await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                # 대기 스레드는 계속 진행되므로, 나중에 슬롯을 얻으면 바로 반납
+                acquiring.add_done_callback(
+                    lambda f: ep.release() if not f.cancelled() and f.exception() is None else None)
+                ep.breaker.abort_trial()
+                raise
+            except TimeoutError:
+                ep.breaker.abort_trial()
+                ep.incr("deadline_exceeded")
+                return self._unavailable(ep, "deadline exceeded", fallback)
+            try:
+                ep.incr("calls")
+                result = await fn()
+            except asyncio.CancelledError:
+                ep.release()
+                ep.breaker.abort_trial()
+                raise
+            except Exception as e:
+                ep.release()
+                if not _is_retryable(e):
+                    ep.breaker.abort_trial()
+                    raise
+                ep.breaker.record_failure()
+                delay = self._backoff(attempt, e, deadline_at)
+                if delay is None:
+                    ep.incr("failures")
+                    if fallback is not None:
+                        return fallback()
+                    raise
+                ep.incr("retries")
+                await asyncio.sleep(delay)
+                continue
+            ep.release()
+            ep.breaker.record_success()
+            return result
+        return self._unavailable(ep, "retries exhausted", fallback)
+
+    def is_available(self, endpoint: str) -> bool:
+        """서킷이 닫혀 있는지 (UI에서 미리 로컬 fallback 을 고를 때)."""
+        return not self._endpoint(endpoint).breaker.is_open
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        return {name: dict(ep.snapshot(), circuit_open=ep.breaker.is_open) for name, ep in endpoints.items()}
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
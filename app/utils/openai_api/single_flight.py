@@ -0,0 +1,90 @@
+"""
+동일 요청 단일 실행 (single-flight)
+- 같은 키(모델 + 입력 + 파라미터)로 동시에 들어온 요청은 업스트림 호출 1번을 공유
+- 스레드(동기)와 이벤트 루프(비동기) 호출이 같은 레지스트리를 공유
+  (결과는 concurrent.futures.Future 로 전달 → 다른 스레드/루프에서도 대기 가능)
+- 완료된 결과는 보관하지 않음 (재사용은 캐시 계층의 역할)
+"""
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def flight_key(namespace: str, params: Any) -> str:
+    """요청 파라미터(dict 등)를 정렬된 JSON 으로 직렬화해 sha256 키 생성."""
+    payload = json.dumps(params, ensure_ascii=False, sort_keys=True, default=str)
+    return f"{namespace}:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def _join(self, key: str):
+        """(future, 리더 여부) — 진행 중인 호출이 없으면 새 future 를 등록하고 리더가 됨."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["followers"] += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self.stats["leaders"] += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        """동기 호출: 같은 key 가 진행 중이면 그 결과를 기다려 반환."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """비동기 호출: 리더는 fn() 을 await, 팔로워는 리더의 결과를 기다림 (팔로워 취소는 리더에 영향 없음)."""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # 리더가 취소돼도 팔로워는 일반 예외로 받아 각자 fallback 처리
+            self._finish(key, future, error=RuntimeError("single-flight leader cancelled"))
+            raise
+        except Exception as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+        return _single_flight
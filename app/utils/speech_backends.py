@@ -0,0 +1,194 @@
+"""
+STT/TTS 백엔드 (VoiceManager 뒤에서 호출별로 선택)
+- OpenAISpeechBackend: whisper-1 / tts-1 (중앙 스케줄러 경유)
+- LocalSpeechBackend: CPU 전용 오프라인 엔진 (선택 의존성)
+  - STT: faster-whisper (LOCAL_STT_MODEL, 기본 tiny.en, int8)
+  - TTS: pyttsx3 (OS 음성 엔진, wav)
+- select_speech_backend: 사용 가능 여부(API 키, 서킷 상태, 의존성) + 관측 지연(EMA)이 지연 예산 안인지로 선택
+  SPEECH_BACKEND=openai|local 이면 해당 백엔드 우선, auto(기본)는 OpenAI 우선
+"""
+import io
+import os
+from abc import ABC, abstractmethod
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+from app.utils.openai_api.client_provider import get_openai_client, has_api_key
+from app.utils.openai_api.scheduler import PRIORITY_INTERACTIVE, get_llm_scheduler
+
+try:
+    from faster_whisper import WhisperModel
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    FASTER_WHISPER_AVAILABLE = False
+
+try:
+    import pyttsx3
+    PYTTSX3_AVAILABLE = True
+except ImportError:
+    PYTTSX3_AVAILABLE = False
+
+# OpenAI TTS 설정 (공유 캐시 키에 포함)
+TTS_MODEL = "tts-1"
+TTS_VOICE = "alloy"  # 선택: alloy, echo, fable, onyx, nova, shimmer
+TTS_FORMAT = "mp3"
+STT_MODEL = "whisper-1"
+
+# 호출 1회 허용 시간 (스케줄러 대기 + 재시도 포함, 초)
+TTS_CALL_DEADLINE = float(os.getenv("TTS_CALL_DEADLINE", "30"))
+STT_CALL_DEADLINE = float(os.getenv("STT_CALL_DEADLINE", "60"))
+
+SPEECH_BACKEND = os.getenv("SPEECH_BACKEND", "auto").lower()
+LOCAL_STT_MODEL = os.getenv("LOCAL_STT_MODEL", "tiny.en")
+LOCAL_STT_THREADS = int(os.getenv("LOCAL_STT_THREADS", "2"))
+
+
+class SpeechBackend(ABC):
+    """STT/TTS 백엔드 공통 인터페이스. kind: "stt" | "tts"."""
+    name = "base"
+    tts_model = ""
+    tts_voice = ""
+    tts_format = "wav"
+    # 관측 전 기본 지연 추정치(초)
+    default_latency = {"stt": 3.0, "tts": 2.0}
+
+    def __init__(self):
+        self._latency = dict(self.default_latency)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def available(self, kind: str) -> bool:
+        ...
+
+    def expected_latency(self, kind: str) -> float:
+        with self._lock:
+            return self._latency[kind]
+
+    def _observe(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self._latency[kind] = self._latency[kind] * 0.7 + seconds * 0.3
+
+    # 실패한 호출도 걸린 시간을 기록 (마감까지 기다리다 실패한 느린 백엔드가 지연 예산 뒤로 밀리도록)
+    def transcribe(self, audio_bytes: bytes, filename: str, priority: int = PRIORITY_INTERACTIVE) -> str:
+        start = time.monotonic()
+        try:
+            return self._transcribe(audio_bytes, filename, priority)
+        finally:
+            self._observe("stt", time.monotonic() - start)
+
+    def synthesize(self, text: str, priority: int = PRIORITY_INTERACTIVE) -> bytes:
+        start = time.monotonic()
+        try:
+            return self._synthesize(text, priority)
+        finally:
+            self._observe("tts", time.monotonic() - start)
+
+    @abstractmethod
+    def _transcribe(self, audio_bytes: bytes, filename: str, priority: int) -> str:
+        ...
+
+    @abstractmethod
+    def _synthesize(self, text: str, priority: int) -> bytes:
+        ...
+
+
+class OpenAISpeechBackend(SpeechBackend):
+    name = "openai"
+    tts_model = TTS_MODEL
+    tts_voice = TTS_VOICE
+    tts_format = TTS_FORMAT
+
+    def available(self, kind: str) -> bool:
+        return has_api_key() and get_llm_scheduler().is_available(kind)
+
+    def _transcribe(self, audio_bytes: bytes, filename: str, priority: int) -> str:
+        audio_file = io.BytesIO(audio_bytes)
+        audio_file.name = filename  # 확장자 필수
+
+        def _call():
+            audio_file.seek(0)  # 재시도 시 처음부터 다시 전송
+            return get_openai_client().audio.transcriptions.create(
+                model=STT_MODEL,
+                file=audio_file,
+                language="en"
+            )
+        transcript = get_llm_scheduler().call("stt", _call, priority=priority, deadline=STT_CALL_DEADLINE)
+        return transcript.text.strip()
+
+    def _synthesize(self, text: str, priority: int) -> bytes:
+        resp = get_llm_scheduler().call("tts", lambda: get_openai_client().audio.speech.create(
+            model=TTS_MODEL,
+            input=text,
+            voice=TTS_VOICE,
+            response_format=TTS_FORMAT
+        ), priority=priority, deadline=TTS_CALL_DEADLINE)
+        return resp.content
+
+
+class LocalSpeechBackend(SpeechBackend):
+    name = "local"
+    tts_model = "pyttsx3"
+    tts_voice = "default"
+    tts_format = "wav"
+    default_latency = {"stt": 4.0, "tts": 1.0}
+
+    def __init__(self):
+        super().__init__()
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._tts_lock = threading.Lock()  # pyttsx3 엔진은 스레드 안전하지 않음
+
+    def available(self, kind: str) -> bool:
+        return FASTER_WHISPER_AVAILABLE if kind == "stt" else PYTTSX3_AVAILABLE
+
+    def _whisper(self):
+        with self._model_lock:
+            if self._model is None:
+                self._model = WhisperModel(LOCAL_STT_MODEL, device="cpu", compute_type="int8",
+                                           cpu_threads=LOCAL_STT_THREADS)
+            return self._model
+
+    def _transcribe(self, audio_bytes: bytes, filename: str, priority: int) -> str:
+        segments, _ = self._whisper().transcribe(io.BytesIO(audio_bytes), language="en", beam_size=1)
+        return " ".join(seg.text.strip() for seg in segments).strip()
+
+    def _synthesize(self, text: str, priority: int) -> bytes:
+        with self._tts_lock, tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tts.wav")
+            engine = pyttsx3.init()
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            with open(path, "rb") as f:
+                return f.read()
+
+
+_backends: Optional[List[SpeechBackend]] = None
+_backends_lock = threading.Lock()
+
+
+def get_speech_backends() -> List[SpeechBackend]:
+    """선호 순서대로 정렬된 백엔드 목록 (프로세스 전역)."""
+    global _backends
+    with _backends_lock:
+        if _backends is None:
+            backends = [OpenAISpeechBackend(), LocalSpeechBackend()]
+            if SPEECH_BACKEND == "local":
+                backends.reverse()
+            _backends = backends
+        return _backends
+
+
+def select_speech_backends(kind: str, latency_budget: Optional[float] = None) -> List[SpeechBackend]:
+    """
+    이번 호출에 시도할 백엔드 순서.
+    - 사용 불가능한 백엔드 제외
+    - latency_budget 이 있으면 예산 안에 들어오는 백엔드(선호 순)를 먼저, 나머지는 빠른 순으로 뒤에
+    """
+    usable = [b for b in get_speech_backends() if b.available(kind)]
+    if latency_budget is None:
+        return usable
+    within = [b for b in usable if b.expected_latency(kind) <= latency_budget]
+    over = sorted((b for b in usable if b not in within), key=lambda b: b.expected_latency(kind))
+    return within + over
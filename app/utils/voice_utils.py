@@ -1,60 +1,483 @@
 """
 OPIc 시험용 통합 음성 기능 유틸리티
-- TTS: OpenAI TTS (mp3)
-- STT: OpenAI Whisper API (BytesIO 기반)
+- TTS/STT: 백엔드 인터페이스(speech_backends) 뒤에서 호출별 선택
+  (OpenAI tts-1/whisper-1 우선, API 장애·지연 예산 초과 시 로컬 CPU 엔진)
+- STT 업로드 전 무음 제거·16 kHz 모노 전처리
+- 긴 녹음은 겹치는 구간으로 나눠 병렬 변환 → 완료된 앞부분부터 부분 자막 표시, 겹침 기준으로 이어붙임
 - 통합 답변 입력 (음성 + 텍스트)
+- 녹음 bytes 는 blob_store, 문제 음성은 공유 TTS 캐시에 두고 세션 상태에는 핸들만 보관
 """
 
-import io
+import hashlib
+import math
 import os
+import re
+import threading
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
 import streamlit as st
-from openai import OpenAI
+
+from app.utils.audio_cache import get_tts_cache, tts_cache_key
+from app.utils.audio_preprocess import audio_format, audio_mime, preprocess_audio, split_windows
+from app.utils.blob_store import load_blob, put_blob
+from app.utils.openai_api.scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from app.utils.openai_api.single_flight import get_single_flight
+from app.utils.speech_backends import get_speech_backends, select_speech_backends
+
+# 문제 음성 백그라운드 선생성 동시 호출 수
+TTS_PREFETCH_WORKERS = int(os.getenv("TTS_PREFETCH_WORKERS", "3"))
+
+# 사용자가 기다리는 호출의 지연 예산(초): 관측 지연이 이보다 큰 백엔드는 뒤로 밀림
+TTS_LATENCY_BUDGET = float(os.getenv("TTS_LATENCY_BUDGET", "8"))
+STT_LATENCY_BUDGET = float(os.getenv("STT_LATENCY_BUDGET", "15"))
+
+# 백그라운드 STT 동시 변환 수 (세션당)
+STT_WORKERS = int(os.getenv("STT_WORKERS", "2"))
+# 변환이 끝나기 전에 확정된 답변 자리표시자 ("[Voice recording" 으로 시작 → 기존 미변환 답변 처리와 동일)
+STT_PENDING_ANSWER = "[Voice recording - transcribing]"
+
+# 청크 단위 변환: STT_CHUNK_SECONDS 초 구간을 STT_CHUNK_OVERLAP 초씩 겹쳐 병렬 변환
+# (녹음 종료 → 변환 완료 시간이 전체 길이가 아니라 구간 1개 변환 시간 수준)
+STT_CHUNK_SECONDS = float(os.getenv("STT_CHUNK_SECONDS", "10"))
+STT_CHUNK_OVERLAP = float(os.getenv("STT_CHUNK_OVERLAP", "1.5"))
+STT_CHUNK_WORKERS = int(os.getenv("STT_CHUNK_WORKERS", "6"))
+# 겹침 구간에서 찾을 최대 단어 수 (겹침 길이 × 초당 약 3단어)
+STITCH_MAX_WORDS = max(2, math.ceil(STT_CHUNK_OVERLAP * 3))
 
 
 class VoiceManager:
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        self.openai_client = OpenAI(api_key=api_key) if api_key else None
+    def tts_available(self) -> bool:
+        return bool(select_speech_backends("tts"))
+
+    def stt_available(self) -> bool:
+        return bool(select_speech_backends("stt"))
+
+    def synthesize(self, text: str, priority: int = PRIORITY_INTERACTIVE) -> bytes:
+        """
+        TTS 호출만 수행 (UI 출력 없음, 실패 시 예외) — 백그라운드 스레드용.
+        - 어느 백엔드로든 이미 만든 음성이 공유 캐시에 있으면 바로 반환
+        - 사용자 대기 호출(PRIORITY_INTERACTIVE)은 지연 예산 안의 백엔드부터, 실패 시 다음 백엔드
+        - 동시에 진행 중인 같은 요청이 있으면 그 결과를 공유 (single-flight)
+        """
+        return self._synthesize_entry(text, priority)[2]
+
+    def synthesize_ref(self, text: str, priority: int = PRIORITY_INTERACTIVE) -> Tuple[str, str]:
+        """synthesize 와 같지만 공유 TTS 캐시의 (key, format) 핸들을 반환 (세션에 bytes 를 두지 않을 때)."""
+        key, fmt, _ = self._synthesize_entry(text, priority)
+        return key, fmt
+
+    def _synthesize_entry(self, text: str, priority: int) -> Tuple[str, str, bytes]:
+        cache = get_tts_cache()
+        budget = TTS_LATENCY_BUDGET if priority == PRIORITY_INTERACTIVE else None
+        candidates = select_speech_backends("tts", budget)
+        if not candidates:
+            # 엔진이 모두 불가일 때만 어느 백엔드든 캐시된 음성 사용
+            for backend in get_speech_backends():
+                key = tts_cache_key(text, backend.tts_voice, backend.tts_model, backend.tts_format)
+                cached = cache.get(key, backend.tts_format)
+                if cached is not None:
+                    return key, backend.tts_format, cached
+            raise RuntimeError("사용 가능한 TTS 엔진이 없음 (OpenAI API 키/로컬 엔진 없음)")
+        last_error: Optional[Exception] = None
+        # 선택된 순서대로 캐시 → 합성 (우선 백엔드가 살아 있으면 하위 백엔드 캐시를 쓰지 않음)
+        for backend in candidates:
+            key = tts_cache_key(text, backend.tts_voice, backend.tts_model, backend.tts_format)
+            cached = cache.get(key, backend.tts_format)
+            if cached is not None:
+                return key, backend.tts_format, cached
+
+            def _fetch(backend=backend, key=key) -> bytes:
+                audio = backend.synthesize(text, priority)
+                cache.put(key, backend.tts_format, audio)
+                return audio
+
+            try:
+                return key, backend.tts_format, get_single_flight().do(f"tts:{key}", _fetch)
+            except Exception as e:
+                print(f"[tts {backend.name} error] {e}")
+                last_error = e
+        raise last_error
 
     def text_to_speech(self, text: str, lang: str = 'en') -> bytes:
-        """텍스트를 음성(mp3)으로 변환 (OpenAI TTS API)"""
-        if not self.openai_client:
-            st.warning("⚠️ OpenAI API 키가 없어 TTS 사용 불가")
-            return None
+        """텍스트를 음성으로 변환 (공유 캐시 우선, 백엔드 자동 선택)"""
         try:
-            resp = self.openai_client.audio.speech.create(
-                model="tts-1",
-                input=text,
-                voice="alloy",  # 선택: alloy, echo, fable, onyx, nova, shimmer
-                response_format="mp3"
-            )
-            return resp.content
+            return self.synthesize(text)
         except Exception as e:
-            st.error(f"TTS 오류: {e}")
+            if not self.tts_available():
+                st.warning("⚠️ 사용 가능한 TTS 엔진이 없어 음성 재생 불가")
+            else:
+                st.error(f"TTS 오류: {e}")
             return None
 
+    def transcribe(self, audio_bytes: bytes, priority: int = PRIORITY_INTERACTIVE) -> str:
+        """STT 호출만 수행 (UI 출력 없음, 실패 시 예외) — 백그라운드 스레드용."""
+        budget = STT_LATENCY_BUDGET if priority == PRIORITY_INTERACTIVE else None
+        candidates = select_speech_backends("stt", budget)
+        if not candidates:
+            raise RuntimeError("사용 가능한 STT 엔진이 없음 (OpenAI API 키/로컬 엔진 없음)")
+        filename = f"input.{audio_format(audio_bytes)}"
+        last_error: Optional[Exception] = None
+        for backend in candidates:
+            try:
+                return backend.transcribe(audio_bytes, filename, priority)
+            except Exception as e:
+                print(f"[stt {backend.name} error] {e}")
+                last_error = e
+        raise last_error
+
     def speech_to_text(self, audio_bytes: bytes) -> str:
-        """음성을 텍스트로 변환 (OpenAI Whisper API, BytesIO 기반)"""
-        if not self.openai_client:
-            st.warning("⚠️ OpenAI API 키가 없어 STT 사용 불가")
+        """음성을 텍스트로 변환 (백엔드 자동 선택)"""
+        if not self.stt_available():
+            st.warning("⚠️ 사용 가능한 STT 엔진이 없어 변환 불가")
             return "[Voice recording - STT unavailable]"
         try:
-            audio_file = io.BytesIO(audio_bytes)
-            audio_file.name = "input.wav"  # 확장자 필수
-            transcript = self.openai_client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                language="en"
-            )
-            return transcript.text.strip()
+            return self.transcribe(audio_bytes)
         except Exception as e:
             st.error(f"STT 오류: {e}")
             return f"[Voice recording - STT error: {e}]"
 
 
+class TTSPrefetcher:
+    """
+    시험 문제 음성 백그라운드 선생성기.
+    - 문제 목록이 정해지면 현재 문제부터 순서대로 TTS를 병렬 요청 (동시 호출 수 제한)
+    - 음성은 공유 TTS 캐시(audio_cache)에 이미 저장되므로 cache(dict, 텍스트 → (key, format))에는 핸들만 보관
+      (세션 blob 저장소에 복사하지 않음 → 녹음 답변의 세션 용량을 차지하지 않음)
+    - 이미 지나간 문제는 아직 시작 전이면 취소
+    - shutdown() 후의 prefetch/get 은 새 작업을 예약하지 않음 (다른 스레드의 콜백이 늦게 와도 안전)
+    """
+
+    def __init__(self, cache: Dict[str, Tuple[str, str]], max_workers: int = TTS_PREFETCH_WORKERS):
+        self.cache = cache
+        self._voice = VoiceManager()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="tts-prefetch")
+        self._futures: Dict[str, Future] = {}
+        self._positions: Dict[str, int] = {}
+        self._current_idx = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _synthesize(self, text: str, priority: int = PRIORITY_BACKGROUND) -> Optional[Tuple[str, str]]:
+        try:
+            ref = self._voice.synthesize_ref(text, priority=priority)
+        except Exception as e:
+            print(f"[tts prefetch error] {e}")
+            return None
+        self.cache[text] = ref
+        return ref
+
+    @staticmethod
+    def _load(ref: Optional[Tuple[str, str]]) -> Optional[bytes]:
+        return get_tts_cache().get(*ref) if ref else None
+
+    def cached(self, text: str) -> Optional[bytes]:
+        """이미 생성된 음성만 반환 (없거나 공유 캐시에서 정리됐으면 None)."""
+        return self._load(self.cache.get(text))
+
+    def prefetch(self, questions: List[str], current_idx: Optional[int] = None) -> None:
+        """
+        current_idx 이후 문제들의 TTS를 예약하고, 지나간 문제의 대기 작업은 취소.
+        current_idx가 없으면 마지막으로 알려진 위치 사용 (백그라운드 문제 생성 콜백용).
+        """
+        with self._lock:
+            if self._closed:
+                return
+            if current_idx is None:
+                current_idx = self._current_idx
+            self._current_idx = current_idx
+            for text, pos in list(self._positions.items()):
+                if pos < current_idx and text not in self.cache:
+                    future = self._futures.get(text)
+                    if future is not None and future.cancel():
+                        del self._futures[text]
+                        del self._positions[text]
+            for idx in range(current_idx, len(questions)):
+                text = questions[idx]
+                if not text or text in self.cache or text in self._futures:
+                    continue
+                self._positions[text] = idx
+                # 지금 보고 있는 문제는 사용자 대기 레인, 나머지는 백그라운드 레인
+                priority = PRIORITY_INTERACTIVE if idx == current_idx else PRIORITY_BACKGROUND
+                self._futures[text] = self._executor.submit(self._synthesize, text, priority)
+
+    def get(self, text: str, timeout: Optional[float] = None) -> Optional[bytes]:
+        """캐시된 음성 반환. 진행 중이면 완료까지 대기, 예약되지 않았으면 즉시 생성."""
+        audio = self.cached(text)
+        if audio is not None:
+            return audio
+        with self._lock:
+            if self._closed:
+                return None
+            future = self._futures.get(text)
+            # 끝난 작업인데 캐시에 없으면 실패했거나 공유 캐시 용량 초과로 정리된 것 → 다시 생성
+            if future is None or future.done():
+                self.cache.pop(text, None)
+                self._positions.pop(text, None)
+                future = self._futures[text] = self._executor.submit(self._synthesize, text, PRIORITY_INTERACTIVE)
+        try:
+            return self._load(future.result(timeout=timeout))
+        except Exception:
+            return None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_tts_prefetcher() -> TTSPrefetcher:
+    """세션별 TTS 선생성기 (tts_audio_cache 에 문제 텍스트 → 공유 TTS 캐시 핸들 보관)."""
+    if "tts_audio_cache" not in st.session_state:
+        st.session_state["tts_audio_cache"] = {}
+    prefetcher = st.session_state.get("tts_prefetcher")
+    if prefetcher is None:
+        prefetcher = TTSPrefetcher(st.session_state["tts_audio_cache"])
+        st.session_state["tts_prefetcher"] = prefetcher
+    return prefetcher
+
+
+def reset_tts_prefetcher() -> None:
+    """새 시험 시작 시 선생성 작업과 문제 음성 캐시 정리."""
+    prefetcher = st.session_state.pop("tts_prefetcher", None)
+    if prefetcher is not None:
+        prefetcher.shutdown()
+    st.session_state.pop("tts_audio_cache", None)
+
+
+def _norm_word(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def _stitch_pair(left: List[str], right: List[str]) -> List[str]:
+    """
+    겹치는 두 구간의 단어 목록 연결.
+    left 의 끝 k 단어와 right 의 처음 k 단어가 일치하는 가장 짧은 k(≤ STITCH_MAX_WORDS)에서 이어붙임
+    (겹침 안에서 반복되는 구절에 더 길게 잘못 맞추지 않도록 짧은 일치 우선;
+    경계에서 잘린 단어 조각은 양쪽 1단어까지 건너뛰고 비교). 일치가 없으면 그대로 연결.
+    """
+    a = [_norm_word(w) for w in left]
+    b = [_norm_word(w) for w in right]
+    for k in range(1, min(len(a), len(b), STITCH_MAX_WORDS) + 1):
+        for skip_a, skip_b in ((0, 0), (0, 1), (1, 0), (1, 1)):
+            end = len(a) - skip_a
+            if end - k < 0 or skip_b + k > len(b):
+                continue
+            # 한 단어 일치는 조각을 건너뛰지 않은 경우만 인정 (우연한 일치 방지)
+            if k == 1 and (skip_a or skip_b):
+                continue
+            if a[end - k:end] == b[skip_b:skip_b + k] and any(a[end - k:end]):
+                return left[:end] + right[skip_b + k:]
+    return left + right
+
+
+def stitch_transcripts(parts: List[str]) -> str:
+    """겹치는 구간별 변환 결과를 하나의 답변으로 연결."""
+    words: List[str] = []
+    for part in parts:
+        words = _stitch_pair(words, (part or "").split())
+    return " ".join(words)
+
+
+class _ChunkedTranscription:
+    """
+    한 녹음의 구간별 병렬 변환.
+    - future: 모든 구간 완료 시 이어붙인 전체 결과 (구간 하나라도 실패하면 그 예외)
+    - partial(): 앞에서부터 연속으로 끝난 구간까지의 부분 결과
+    """
+
+    def __init__(self, voice: "VoiceManager", executor: ThreadPoolExecutor, chunks: List[bytes]):
+        self.future: Future = Future()
+        self._chunks = [executor.submit(voice.transcribe, chunk) for chunk in chunks]
+        self._remaining = len(self._chunks)
+        self._lock = threading.Lock()
+        self.future.add_done_callback(self._on_cancel)
+        for chunk in self._chunks:
+            chunk.add_done_callback(self._on_chunk_done)
+
+    def _on_cancel(self, future: Future) -> None:
+        if future.cancelled():
+            for chunk in self._chunks:
+                chunk.cancel()
+
+    def _on_chunk_done(self, chunk: Future) -> None:
+        with self._lock:
+            self._remaining -= 1
+            last = self._remaining == 0
+        if self.future.done():
+            return
+        try:
+            if chunk.cancelled():
+                self.future.set_exception(RuntimeError("transcription chunk cancelled"))
+            elif chunk.exception() is not None:
+                self.future.set_exception(chunk.exception())
+            elif last:
+                self.future.set_result(stitch_transcripts([c.result() for c in self._chunks]))
+        except InvalidStateError:
+            pass  # 다른 구간이 먼저 실패를 보고했거나 취소됨
+
+    def partial(self) -> str:
+        texts = []
+        for chunk in self._chunks:
+            if not chunk.done() or chunk.cancelled() or chunk.exception() is not None:
+                break
+            texts.append(chunk.result())
+        return stitch_transcripts(texts)
+
+    @property
+    def progress(self) -> Tuple[int, int]:
+        return sum(1 for c in self._chunks if c.done()), len(self._chunks)
+
+
+class TranscriptionQueue:
+    """
+    녹음 직후 백그라운드 STT 변환.
+    - 문항 번호(idx)별 최신 녹음 1개만 유지 (다시 녹음하면 이전 작업은 취소/무시)
+    - STT_CHUNK_SECONDS 보다 긴 녹음은 겹치는 구간으로 나눠 병렬 변환 (partial() 로 진행 중 결과 조회)
+    - 스레드에서는 st.* 를 호출하지 않음 (답변 반영은 렌더링 쪽 sync_transcripts 에서)
+    """
+
+    def __init__(self, max_workers: int = STT_WORKERS):
+        self._voice = VoiceManager()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="stt")
+        self._chunk_executor = ThreadPoolExecutor(max_workers=max(1, STT_CHUNK_WORKERS), thread_name_prefix="stt-chunk")
+        self._jobs: Dict[int, Tuple[str, Future]] = {}
+        self._chunked: Dict[int, _ChunkedTranscription] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, idx: int, audio_bytes: bytes) -> None:
+        digest = hashlib.sha256(audio_bytes).hexdigest()
+        with self._lock:
+            job = self._jobs.get(idx)
+            if job is not None and job[0] == digest:
+                return
+            if job is not None:
+                job[1].cancel()
+            self._chunked.pop(idx, None)
+            chunks = split_windows(audio_bytes, STT_CHUNK_SECONDS, STT_CHUNK_OVERLAP)
+            if len(chunks) > 1:
+                chunked = _ChunkedTranscription(self._voice, self._chunk_executor, chunks)
+                self._chunked[idx] = chunked
+                self._jobs[idx] = (digest, chunked.future)
+            else:
+                self._jobs[idx] = (digest, self._executor.submit(self._voice.transcribe, audio_bytes))
+
+    def discard(self, idx: int) -> None:
+        with self._lock:
+            job = self._jobs.pop(idx, None)
+            self._chunked.pop(idx, None)
+        if job is not None:
+            job[1].cancel()
+
+    def is_pending(self, idx: int) -> bool:
+        with self._lock:
+            job = self._jobs.get(idx)
+        return job is not None and not job[1].done()
+
+    def partial(self, idx: int) -> Tuple[str, int, int]:
+        """(부분 결과, 끝난 구간 수, 전체 구간 수) — 구간 분할하지 않은 작업이면 ("", 0, 1)."""
+        with self._lock:
+            chunked = self._chunked.get(idx)
+        if chunked is None:
+            return "", 0, 1
+        return (chunked.partial(),) + chunked.progress
+
+    def pending(self) -> List[int]:
+        with self._lock:
+            return [idx for idx, (_, f) in self._jobs.items() if not f.done()]
+
+    def result(self, idx: int) -> Tuple[Optional[str], Optional[BaseException]]:
+        """(transcript, error) — 진행 중이거나 작업이 없으면 (None, None)."""
+        with self._lock:
+            job = self._jobs.get(idx)
+        if job is None or not job[1].done() or job[1].cancelled():
+            return None, None
+        error = job[1].exception()
+        return (None, error) if error is not None else (job[1].result(), None)
+
+    def finished(self) -> Dict[int, Tuple[Optional[str], Optional[BaseException]]]:
+        with self._lock:
+            indices = [idx for idx, (_, f) in self._jobs.items() if f.done() and not f.cancelled()]
+        return {idx: self.result(idx) for idx in indices}
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """진행 중인 변환이 끝날 때까지 대기 (피드백 단계용)."""
+        with self._lock:
+            futures = [f for _, f in self._jobs.values() if not f.done()]
+        if futures:
+            wait(futures, timeout=timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            futures = [f for _, f in self._jobs.values()]
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._chunk_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_transcription_queue() -> TranscriptionQueue:
+    """세션별 백그라운드 STT 큐."""
+    queue = st.session_state.get("transcription_queue")
+    if queue is None:
+        queue = TranscriptionQueue()
+        st.session_state["transcription_queue"] = queue
+    return queue
+
+
+def reset_transcription_queue() -> None:
+    queue = st.session_state.pop("transcription_queue", None)
+    if queue is not None:
+        queue.shutdown()
+
+
+def sync_transcripts(finalize: bool = False) -> List[Tuple[int, str]]:
+    """
+    완료된 변환 결과를 세션에 반영 (렌더링 스레드에서 호출).
+    - ans_{idx} 가 비어 있거나 자리표시자면 변환 결과로 채움 (직접 입력한 텍스트는 유지)
+    - 이미 확정된 exam_answers[idx] 가 자리표시자면 교체하고 (idx, 답변) 목록으로 반환 → 호출 측에서 채점 요청
+    - finalize=True: 실패했거나 아직 끝나지 않은 자리표시자 답변은 "무응답"으로 확정 (피드백 단계)
+    """
+    queue = st.session_state.get("transcription_queue")
+    answers = st.session_state.get("exam_answers", [])
+    updated = []
+    for idx, (transcript, error) in (queue.finished() if queue is not None else {}).items():
+        answer_key = f"ans_{idx}"
+        current = st.session_state.get(answer_key, "")
+        if transcript and (not current or current.startswith("[Voice recording")):
+            st.session_state[answer_key] = transcript
+            st.session_state[f"audio_{idx}"] = st.session_state.get(f"audio_data_{idx}")
+        elif error is not None and current == STT_PENDING_ANSWER:
+            # 실패 시 답변을 비움 (오류 문구가 답변으로 채점되지 않도록; 화면에는 변환 실패 안내)
+            st.session_state[answer_key] = ""
+        if idx < len(answers) and answers[idx] == STT_PENDING_ANSWER:
+            if transcript:
+                answers[idx] = transcript
+                updated.append((idx, transcript))
+            elif error is not None and finalize:
+                answers[idx] = "무응답"
+    if finalize:
+        for idx, answer in enumerate(answers):
+            if answer == STT_PENDING_ANSWER:
+                answers[idx] = "무응답"
+    return updated
+
+
+@st.fragment(run_every=1.0)
+def _live_transcript(question_idx: int) -> None:
+    """변환 진행 상황 + 앞에서부터 완료된 구간의 부분 자막 (1초마다 이 영역만 갱신, 완료 시 전체 재실행으로 반영)."""
+    queue = get_transcription_queue()
+    if not queue.is_pending(question_idx):
+        st.rerun()
+    text, done, total = queue.partial(question_idx)
+    progress = f" ({done}/{total} 구간)" if total > 1 else ""
+    st.info(f"🔄 음성을 텍스트로 변환 중{progress}... 기다리지 않고 다음 문제로 넘어가도 완료되면 자동 반영됩니다.")
+    if text:
+        st.caption(f"📝 {text} …")
+
+
 def unified_answer_input(question_idx: int, question_text: str) -> str:
-    """통합된 답변 입력 UI (음성 + 텍스트)"""
-    voice_manager = VoiceManager()
+    """통합된 답변 입력 UI (음성 + 텍스트) — 녹음은 백그라운드로 변환 (화면을 막지 않음)"""
     answer_key = f"ans_{question_idx}"
     current_answer = st.session_state.get(answer_key, "")
 
@@ -68,30 +491,37 @@ def unified_answer_input(question_idx: int, question_text: str) -> str:
         audio_data_key = f"audio_data_{question_idx}"
         stt_flag_key = f"stt_done_{question_idx}"
 
-        audio_data = st.session_state.get(audio_data_key)
+        audio_data = load_blob(st.session_state.get(audio_data_key))
         if audio_data:
-            st.audio(audio_data, format="audio/wav")
+            st.audio(audio_data, format=audio_mime(audio_data))
 
         audio_value = st.audio_input(
             "마이크 버튼을 눌러 녹음하세요",
             key=f"audio_input_{question_idx}"
         )
 
-        if audio_value is not None and not st.session_state.get(stt_flag_key):
+        queue = get_transcription_queue()
+        # stt_done_{idx}: 변환 요청을 보낸 녹음의 해시 (새로 녹음하면 다시 요청)
+        raw_audio = audio_value.getvalue() if audio_value is not None else None
+        raw_digest = hashlib.sha256(raw_audio).hexdigest() if raw_audio else None
+        if raw_audio and st.session_state.get(stt_flag_key) != raw_digest:
             st.success("🎵 음성이 녹음되었습니다!")
-            st.session_state[audio_data_key] = audio_value.getvalue()
-            st.audio(audio_value, format="audio/wav")
-            with st.spinner("🔄 음성을 텍스트로 변환 중..."):
-                transcript = voice_manager.speech_to_text(audio_value.getvalue())
-            if transcript and not transcript.startswith("[Voice recording"):
-                final_answer = transcript
-                st.session_state[answer_key] = final_answer
-                st.session_state[stt_flag_key] = True
-                st.rerun()
-            else:
-                st.error("⚠️ 음성 변환 실패. 다시 시도하세요.")
+            # 무음 제거 + 16 kHz 모노로 줄인 오디오만 저장/업로드
+            # 세션 상태에는 blob 핸들만 보관
+            processed = preprocess_audio(raw_audio)
+            st.session_state[audio_data_key] = put_blob(processed)
+            st.audio(processed, format=audio_mime(processed))
+            queue.submit(question_idx, processed)
+            st.session_state[stt_flag_key] = raw_digest
+            if not current_answer or current_answer.startswith("[Voice recording"):
+                st.session_state[answer_key] = STT_PENDING_ANSWER
         elif audio_value is None and st.session_state.get(stt_flag_key):
-            st.session_state[stt_flag_key] = False
+            st.session_state[stt_flag_key] = None
+
+        if queue.is_pending(question_idx):
+            _live_transcript(question_idx)
+        elif queue.result(question_idx)[1] is not None:
+            st.error("⚠️ 음성 변환 실패. 다시 시도하세요.")
 
     # 💬 텍스트 입력 탭
     with tab2:
@@ -110,7 +540,7 @@ def unified_answer_input(question_idx: int, question_text: str) -> str:
 
 
 def auto_convert_audio_if_needed(question_idx: int) -> str:
-    """Next 버튼 클릭 시 자동 STT 변환"""
+    """Next 버튼 클릭 시 STT 결과 반영 (변환 중이면 기다리지 않고 자리표시자 반환)"""
     answer_key = f"ans_{question_idx}"
     audio_key = f"audio_data_{question_idx}"
 
@@ -118,18 +548,20 @@ def auto_convert_audio_if_needed(question_idx: int) -> str:
     if existing_answer and not existing_answer.startswith("[Voice recording"):
         return existing_answer
 
-    audio_data = st.session_state.get(audio_key)
-    if audio_data:
-        try:
-            voice_manager = VoiceManager()
-            transcript = voice_manager.speech_to_text(audio_data)
-            if transcript and not transcript.startswith("[Voice recording"):
-                st.session_state[answer_key] = transcript
-                st.session_state[f"audio_{question_idx}"] = audio_data
-                return transcript
-            return "[Voice recording - conversion failed]"
-        except Exception as e:
-            return f"[Voice recording - STT error: {e}]"
+    audio_ref = st.session_state.get(audio_key)
+    if audio_ref:
+        queue = get_transcription_queue()
+        transcript, error = queue.result(question_idx)
+        if transcript:
+            st.session_state[answer_key] = transcript
+            st.session_state[f"audio_{question_idx}"] = audio_ref
+            return transcript
+        if error is not None:
+            return ""
+        audio_data = load_blob(audio_ref)
+        if audio_data:
+            queue.submit(question_idx, audio_data)  # 이미 요청된 녹음이면 무시됨
+        return STT_PENDING_ANSWER
 
     return existing_answer
 
@@ -143,4 +575,4 @@ def display_tts_button(text, message_index=0):
             voice_manager = VoiceManager()
             audio_data = voice_manager.text_to_speech(text)
             if audio_data:
-                st.audio(audio_data, format="audio/mp3")
+                st.audio(audio_data, format=audio_mime(audio_data))
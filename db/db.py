@@ -1,6 +1,8 @@
 import os
 import json
-from pymongo import MongoClient
+import time
+import threading
+from pymongo import MongoClient, UpdateOne
 from dotenv import load_dotenv
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -17,18 +19,129 @@ if not MONGO_URI:
         "MONGO_URI 환경변수가 비어 있습니다. 루트의 .env 파일 또는 OS 환경변수를 설정하세요."
     )
 
+# 커넥션 풀 설정 (환경변수로 조정 가능)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+# 헬스체크 주기(초): 이 간격보다 자주 ping 하지 않음
+MONGO_HEALTH_CHECK_INTERVAL = float(os.getenv("MONGO_HEALTH_CHECK_INTERVAL", "30"))
+
+# 프로세스 전역 클라이언트 레지스트리 (uri -> 상태)
+_registry_lock = threading.Lock()
+_clients = {}
+
+
+class _ClientEntry:
+    def __init__(self, client: MongoClient):
+        self.client = client
+        self.pid = os.getpid()
+        self.last_check = 0.0
+
+
+def _reset_after_fork():
+    """fork 된 자식 프로세스는 부모의 소켓을 공유하면 안 되므로 레지스트리를 비운다."""
+    global _registry_lock
+    _registry_lock = threading.Lock()
+    _clients.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _new_client(uri: str) -> MongoClient:
+    return MongoClient(
+        uri,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        heartbeatFrequencyMS=max(500, int(MONGO_HEALTH_CHECK_INTERVAL * 1000)),
+    )
+
+
+def get_client(uri: str = None) -> MongoClient:
+    """
+    프로세스 전역 MongoClient 반환 (지연 생성, fork-safe).
+    - 최초 호출 시에만 클라이언트를 만들고 이후엔 재사용
+    - MONGO_HEALTH_CHECK_INTERVAL 초마다 한 번만 ping, 실패하면 클라이언트 재생성
+    """
+    uri = uri or MONGO_URI
+    with _registry_lock:
+        entry = _clients.get(uri)
+        if entry is not None and entry.pid != os.getpid():
+            # register_at_fork 미지원 환경 대비
+            entry = None
+        if entry is None:
+            entry = _ClientEntry(_new_client(uri))
+            _clients[uri] = entry
+            print(f"MongoDB 클라이언트 생성 (pid: {entry.pid}, maxPoolSize: {MONGO_MAX_POOL_SIZE})")
+
+    now = time.monotonic()
+    if now - entry.last_check >= MONGO_HEALTH_CHECK_INTERVAL:
+        try:
+            entry.client.admin.command("ping")
+            entry.last_check = now
+        except Exception:
+            with _registry_lock:
+                if _clients.get(uri) is entry:
+                    del _clients[uri]
+            entry.client.close()
+            raise
+    return entry.client
+
+
+def get_collection(collection_name: str, uri: str = None):
+    """재연결 없이 풀링된 클라이언트에서 컬렉션 핸들 반환."""
+    return get_client(uri)[DB_NAME][collection_name]
+
+
+def close_clients():
+    """테스트/종료 시 전역 클라이언트 정리."""
+    with _registry_lock:
+        entries = list(_clients.values())
+        _clients.clear()
+    for entry in entries:
+        if entry.pid == os.getpid():
+            entry.client.close()
+
+
 def connect_db(collection_name):
     try:
-        client = MongoClient(MONGO_URI)
-        client.server_info()  # 연결 확인
-        db = client[DB_NAME]
-        collection = db[collection_name]
-        print(f"MongoDB 연결 성공 (컬렉션: {collection_name})")
-        return collection
+        return get_collection(collection_name)
     except Exception as e:
         print(f"MongoDB 연결 실패: {e.__class__.__name__} - {e}")
         return None
 
+def bulk_add_questions(collection_name, docs, extra_fields=None):
+    """
+    (category, topic) 문서의 content 배열에 질문을 bulk로 추가 (upsert, 중복 무시).
+    docs: [{"category": ..., "topic": ..., "content": [질문...]}, ...]
+    반환: 실제로 반영된(생성+수정) 문서 수
+    """
+    col = connect_db(collection_name)
+    if col is None or not docs:
+        return 0
+    col.create_index([("category", 1), ("topic", 1)], unique=True)
+
+    ops = []
+    for doc in docs:
+        update = {"$addToSet": {"content": {"$each": list(doc.get("content", []))}}}
+        fields = {**(extra_fields or {}), **{k: v for k, v in doc.items() if k not in ("category", "topic", "content")}}
+        if fields:
+            update["$set"] = fields
+        ops.append(UpdateOne({"category": doc["category"], "topic": doc["topic"]}, update, upsert=True))
+
+    result = col.bulk_write(ops, ordered=False)
+    changed = result.upserted_count + result.modified_count
+    print(f"Bulk wrote {changed} documents into {DB_NAME}.{collection_name}")
+    return changed
+
 def upload_contents(json_path, collection_name, overwrite=True, uri=None):
     col = connect_db(collection_name)
     if col is None:
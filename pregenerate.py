@@ -0,0 +1,159 @@
+"""
+OPIc 질문 뱅크 사전 생성 배치
+- EXAM_TOPICS + data/opic_question.json 의 모든 토픽을 순회
+- 토픽마다 N개 질문을 병렬(동시 호출 수 + 분당 요청 수 제한)로 생성
+- 시드/기존 뱅크/생성분끼리 중복 제거 후 opic_generated 컬렉션에 bulk write
+  → create_opic_exam은 뱅크가 채워진 토픽에 대해 DB 조회만으로 시험 구성
+    (시드가 부족하면 뱅크로 채우고, 시드로 충분하면 QUESTION_VARIANT_SLOTS 개를 뱅크 질문으로 교체)
+
+사용 예:
+    python pregenerate.py --per-topic 9 --concurrency 4 --rpm 60
+    python pregenerate.py --categories role_play random_question --dry-run
+"""
+import re
+import time
+import asyncio
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from openai import AsyncOpenAI
+
+from app.utils.openai_api.client_provider import close_async_openai_client, get_async_openai_client
+from app.utils.openai_api.scheduler import PRIORITY_BACKGROUND
+from db.db import bulk_add_questions
+from quest import (
+    EXAM_TOPICS, GENERATED_COLLECTION, QUESTION_PROMPT_VERSION,
+    opic_data, fetch_seed_questions, generate_openai_questions_async,
+    _build_question_prompt, _normalize_key,
+)
+
+QUESTIONS_PER_CALL = 3
+
+
+class _RateLimiter:
+    """분당 요청 수 제한 (요청 시작 간격을 60/rpm 초로 고정)."""
+
+    def __init__(self, rpm: int):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _dedup_key(question: str) -> str:
+    # 번호/기호/공백/대소문자 차이는 같은 질문으로 취급
+    q = re.sub(r"^\s*(\d+[.)]|[-*•])\s*", "", question)
+    return re.sub(r"[^a-z0-9]+", " ", q.lower()).strip()
+
+
+def _clean(question: str) -> str:
+    return re.sub(r"^\s*(\d+[.)]|[-*•])\s*", "", question).strip()
+
+
+def collect_topics(categories: List[str]) -> List[Tuple[str, str]]:
+    """EXAM_TOPICS + opic_question.json 의 (category, topic) 목록 (정규화 기준 중복 제거)."""
+    seen, pairs = set(), []
+    for source in (EXAM_TOPICS, opic_data):
+        for category, topics in source.items():
+            if category not in categories:
+                continue
+            for topic in topics:
+                key = (category, _normalize_key(topic))
+                if key not in seen:
+                    seen.add(key)
+                    pairs.append((category, topic))
+    return pairs
+
+
+async def _generate_for_topic(category: str, topic: str, seeds: List[str], existing: List[str],
+                              per_topic: int, client: AsyncOpenAI, semaphore: asyncio.Semaphore,
+                              limiter: _RateLimiter, max_rounds: int) -> List[str]:
+    taken = {_dedup_key(q) for q in seeds + existing}
+    fresh: List[str] = []
+    prompt = _build_question_prompt(topic, category, seeds)
+    for _ in range(max_rounds):
+        if len(fresh) >= per_topic:
+            break
+        async with semaphore:
+            await limiter.wait()
+            batch = await generate_openai_questions_async(prompt, QUESTIONS_PER_CALL, client=client,
+                                                          priority=PRIORITY_BACKGROUND)
+        for q in map(_clean, batch):
+            k = _dedup_key(q)
+            if q and k not in taken:
+                taken.add(k)
+                fresh.append(q)
+    return fresh[:per_topic]
+
+
+async def pregenerate(categories: List[str], per_topic: int, concurrency: int, rpm: int,
+                      dry_run: bool = False) -> Dict[Tuple[str, str], List[str]]:
+    pairs = collect_topics(categories)
+    seeds = fetch_seed_questions(pairs)
+    existing = fetch_seed_questions(pairs, GENERATED_COLLECTION)
+
+    # DB에 시드가 없으면 opic_question.json 내용을 컨텍스트로 사용
+    for category, topic in pairs:
+        if not seeds[(category, topic)]:
+            local = opic_data.get(category, {})
+            seeds[(category, topic)] = next(
+                (v for k, v in local.items() if _normalize_key(k) == _normalize_key(topic)), []
+            )
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = _RateLimiter(rpm)
+    max_rounds = -(-per_topic // QUESTIONS_PER_CALL) * 2  # 중복/실패 대비 2배까지 재시도
+    client = get_async_openai_client()
+    try:
+        targets = [(c, t) for c, t in pairs
+                   if seeds[(c, t)] and len(existing[(c, t)]) < per_topic]
+        results = await asyncio.gather(*[
+            _generate_for_topic(c, t, seeds[(c, t)], existing[(c, t)],
+                                per_topic - len(existing[(c, t)]), client, semaphore, limiter, max_rounds)
+            for c, t in targets
+        ])
+    finally:
+        await close_async_openai_client()
+
+    generated = {pair: qs for pair, qs in zip(targets, results) if qs}
+    print(f"{len(pairs)} topics, {len(targets)} needed generation, "
+          f"{sum(len(v) for v in generated.values())} new questions")
+
+    if not dry_run and generated:
+        now = datetime.now(timezone.utc)
+        docs = [{"category": c, "topic": _normalize_key(t), "content": qs}
+                for (c, t), qs in generated.items()]
+        bulk_add_questions(GENERATED_COLLECTION, docs,
+                           extra_fields={"prompt_version": QUESTION_PROMPT_VERSION, "updated_at": now})
+    return generated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-generate the OPIc question bank (opic_generated).")
+    parser.add_argument("--per-topic", type=int, default=9, help="topic당 뱅크에 유지할 질문 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 OpenAI 호출 수")
+    parser.add_argument("--rpm", type=int, default=60, help="분당 최대 요청 수 (0이면 제한 없음)")
+    parser.add_argument("--categories", nargs="+", default=list(EXAM_TOPICS.keys()),
+                        choices=list(EXAM_TOPICS.keys()))
+    parser.add_argument("--dry-run", action="store_true", help="DB에 쓰지 않고 결과만 출력")
+    args = parser.parse_args()
+
+    generated = asyncio.run(pregenerate(args.categories, args.per_topic, args.concurrency,
+                                        args.rpm, dry_run=args.dry_run))
+    if args.dry_run:
+        for (category, topic), qs in generated.items():
+            print(f"[{category}] {topic}")
+            for q in qs:
+                print(f"  - {q}")
+
+
+if __name__ == "__main__":
+    main()
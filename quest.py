@@ -1,16 +1,26 @@
 import os
+import re
 import json
+import random
 import asyncio
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import threading
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from openai import AsyncOpenAI
 from db.db import connect_db
+from app.utils.openai_api.client_provider import get_async_openai_client, get_openai_client, has_api_key
+from app.utils.openai_api.scheduler import PRIORITY_BACKGROUND, PRIORITY_NORMAL, get_llm_scheduler
+from app.utils.openai_api.single_flight import flight_key, get_single_flight
+from question_cache import get_question_cache
 
 # 서베이랑 질문 topic 매칭위한 파일 경로
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 DEFAULT_MAP_PATH = os.path.join(DATA_DIR, "survey_topic_map.json")
 
 # 오픽 질문 샘플 파일 경로
-OPIC_DATA_PATH = os.path.join(os.path.dirname(__file__), "opic_question.json")
+OPIC_DATA_PATH = os.path.join(DATA_DIR, "opic_question.json")
+
+# 사전 생성된 질문 뱅크 컬렉션 (pregenerate.py가 채움)
+GENERATED_COLLECTION = "opic_generated"
 
 # JSON 파일 로드
 def load_json(path: str) -> Optional[Dict[str, Any]]:
@@ -24,6 +34,32 @@ def load_json(path: str) -> Optional[Dict[str, Any]]:
 # 파일이 없거나 오류가 발생하면 빈 딕셔너리를 사용합니다.
 opic_data = load_json(OPIC_DATA_PATH) or {}
 
+# 시험에 출제 가능한 전체 토픽 (카테고리별)
+EXAM_TOPICS: Dict[str, List[str]] = {
+    "survey": [
+        "have work experience", "living alone in a house/apartment", "living with friends in a house/apartment",
+        "living with family in a house/apartment", "dormitory", "military barracks", "student",
+        "museum", "watching sports", "TV", "watching cooking programs", "driving", "club", "park",
+        "Improving living space", "texting friends", "watching reality shows", "spa/massage shop",
+        "camping", "performance", "bar/pub", "billiard", "test preparation", "news", "shopping",
+        "beach", "volunteering", "chess", "cafe", "SNS", "movies", "game", "concert", "health",
+        "searching job", "reading books to children", "music", "musical instruments", "dancing",
+        "writing", "drawing", "cooking", "pets", "reading", "investing", "travel magazine", "singing",
+        "basketball", "baseball/softball", "soccer", "american football", "hockey", "cricket",
+        "golf", "volleyball", "tennis", "badminton", "table tennis", "swimming", "bicycling",
+        "skiing/snowboarding", "ice skating", "jogging", "walking", "yoga", "hiking/trekking",
+        "fishing", "taekwondo", "taking fitness classes", "do not exercise",
+        "domestic business trip", "overseas business trip", "staycation", "domestic travel",
+        "international travel", "newspaper", "taking photos"
+    ],
+    "role_play": [
+        "Getting Ready for Traveling", "Cancelling Appointment", "Item Purchase"
+    ],
+    "random_question": [
+        "technology", "industry", "recycling", "weather"
+    ]
+}
+
 # 서베이 내용(키)을 표준화 함수
 def _normalize_key(s: str) -> str:
     return s.strip().lower()
@@ -43,7 +79,7 @@ def load_survey_map(map_path: str = DEFAULT_MAP_PATH) -> Dict[str, str]:
 
 # MongoDB에서 서베이 질문 가져오기
 def get_questions_from_db(survey_topic: str) -> List[str]:
-    # connect_db is a synchronous function, so await is not needed.
+    # connect_db는 풀링된 전역 클라이언트의 컬렉션 핸들을 돌려준다 (재연결 없음).
     db_collection = connect_db('opic_samples')
 
     if db_collection is None:
@@ -96,64 +132,324 @@ def get_random_questions_from_db(random_topic: str) -> List[str]:
 
     return []
 
+# 시험 블루프린트 전체의 시드 질문을 한 번의 쿼리로 가져오기
+def _seed_lookup_key(category: str, topic: str) -> Tuple[str, str]:
+    # survey/random_question은 소문자 정확 일치, role_play는 대소문자 무시 일치
+    # → 둘 다 소문자 비교로 통일해 결과를 원래 (category, topic) 키에 다시 매핑
+    return category, _normalize_key(topic)
+
+
+def fetch_seed_questions(blueprint: List[Tuple[str, str]],
+                         collection_name: str = 'opic_samples') -> Dict[Tuple[str, str], List[str]]:
+    """
+    Fetches the seed questions for a whole exam blueprint in a single query.
+    blueprint: [(category, topic), ...] e.g. 3 survey topics + 1 role_play + 1 random_question
+    collection_name: 'opic_samples' (seeds) or GENERATED_COLLECTION (pre-generated bank)
+    Returns {(category, topic): [questions]} keyed exactly as given (missing topics -> []).
+    """
+    results: Dict[Tuple[str, str], List[str]] = {tuple(item): [] for item in blueprint}
+    if not blueprint:
+        return results
+
+    db_collection = connect_db(collection_name)
+    if db_collection is None:
+        return results
+
+    # 카테고리별로 토픽을 묶어 $or / $in 조건 구성
+    by_category: Dict[str, List[Any]] = {}
+    for category, topic in results:
+        if category == 'role_play':
+            pattern = re.compile(f"^{re.escape(topic)}$", re.IGNORECASE)
+            by_category.setdefault(category, []).append(pattern)
+        else:
+            by_category.setdefault(category, []).append(_normalize_key(topic))
+
+    query = {"$or": [
+        {"category": category, "topic": {"$in": topics}}
+        for category, topics in by_category.items()
+    ]}
+
+    found: Dict[Tuple[str, str], List[str]] = {}
+    for document in db_collection.find(query, {"_id": 0, "category": 1, "topic": 1, "content": 1}):
+        key = _seed_lookup_key(document.get("category", ""), document.get("topic", ""))
+        # find_one과 동일하게 첫 번째 문서만 사용
+        found.setdefault(key, document.get("content", []))
+
+    for category, topic in results:
+        results[(category, topic)] = found.get(_seed_lookup_key(category, topic), [])
+    return results
+
+
+# 질문 생성 모델/파라미터 (sync/async 공통)
+QUESTION_MODEL = "gpt-3.5-turbo"
+QUESTION_SYSTEM_PROMPT = "You are a helpful assistant for generating language test questions."
+# 프롬프트/모델이 바뀌면 올려서 기존 질문 풀 캐시를 무효화
+QUESTION_PROMPT_VERSION = f"v1:{QUESTION_MODEL}"
+
+# 비동기 시험 생성 기본값: 시험 1회당 동시 LLM 호출 수, 호출당 타임아웃(초)
+EXAM_MAX_CONCURRENCY = int(os.getenv("EXAM_MAX_CONCURRENCY", "5"))
+EXAM_CALL_TIMEOUT = float(os.getenv("EXAM_CALL_TIMEOUT", "20"))
+# 시드만으로 count를 채우는 주제에서 뒤쪽 시드 중 이 수만큼을 생성 질문(뱅크/풀)으로 교체 (매 시험 같은 문제 방지)
+QUESTION_VARIANT_SLOTS = int(os.getenv("QUESTION_VARIANT_SLOTS", "1"))
+
+
+def _question_request(prompt: str) -> Dict[str, Any]:
+    return dict(
+        model=QUESTION_MODEL,  # Use an appropriate model
+        messages=[
+            {"role": "system", "content": QUESTION_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=150,
+        n=1,
+        stop=None,
+        temperature=0.7,
+    )
+
+
+def _parse_questions(questions_text: str, questions_needed: int) -> List[str]:
+    questions_list = [q.strip() for q in (questions_text or "").strip().split('\n') if q.strip()]
+    return questions_list[:questions_needed]
+
+
+def _build_question_prompt(topic: str, category: str, db_questions: List[str]) -> str:
+    context_str = "\n".join(f"- {q}" for q in db_questions)
+    return (
+        f"You are an OPIC question generator.\n\n"
+        f"Here are some sample questions about the topic '{topic}' in category '{category}':\n"
+        f"{context_str}\n\n"
+        f"Now, generate 3 new OPIC-style questions that are similar in style and difficulty, "
+        f"Make sure they are open-ended and not duplicates of the examples."
+    )
+
+
+def _pool_key(topic: str, category: str, level: str) -> Tuple[str, str, str, str]:
+    return category, _normalize_key(topic), str(level), QUESTION_PROMPT_VERSION
+
+
+def _sample_bank(generated_bank: Optional[List[str]], db_questions: List[str], k: int = 3) -> List[str]:
+    # 사전 생성 뱅크에 시드와 겹치지 않는 질문이 k개 이상 있을 때만 사용
+    candidates = [q for q in (generated_bank or []) if q not in set(db_questions)]
+    if len(candidates) < k:
+        return []
+    return random.sample(candidates, k)
+
+
+_refilling: set = set()
+_refilling_lock = threading.Lock()
+
+
+def _refill_pool_in_background(topic: str, category: str, key: Tuple[str, str, str, str],
+                               db_questions: List[str]) -> None:
+    """풀 보충을 백그라운드 스레드로 예약 (키당 1개, 시험 생성 경로는 기다리지 않음)."""
+    if not has_api_key():
+        return
+    with _refilling_lock:
+        if key in _refilling:
+            return
+        _refilling.add(key)
+
+    def _run() -> None:
+        try:
+            prompt = _build_question_prompt(topic, category, db_questions)
+            get_question_cache().add(key, generate_openai_questions(prompt, 3, priority=PRIORITY_BACKGROUND))
+        finally:
+            with _refilling_lock:
+                _refilling.discard(key)
+
+    threading.Thread(target=_run, name="question-pool-refill", daemon=True).start()
+
+
+def _variant_questions(topic: str, category: str, level: str, count: int,
+                       db_questions: List[str], generated_bank: Optional[List[str]]) -> List[str]:
+    """
+    시드만으로 count를 채우는 경우의 변형 질문 (LLM 호출을 기다리지 않음).
+    사전 생성 뱅크 → 신선한 풀 순으로 QUESTION_VARIANT_SLOTS 개까지 고르고, 풀이 부족하면 백그라운드 보충만 예약.
+    """
+    slots = min(QUESTION_VARIANT_SLOTS, count)
+    if slots <= 0 or not db_questions:
+        return []
+    banked = _sample_bank(generated_bank, db_questions, k=slots)
+    if banked:
+        return banked
+    cache = get_question_cache()
+    key = _pool_key(topic, category, level)
+    if cache.needs_refill(key):
+        _refill_pool_in_background(topic, category, key, db_questions)
+    return cache.sample(key, slots, exclude=db_questions)
+
+
+def _db_questions_for(topic: str, category: str) -> List[str]:
+    if category == 'survey':
+        return get_questions_from_db(topic)
+    if category == 'role_play':
+        return get_role_play_questions_from_db(topic)
+    if category == 'random_question':
+        return get_random_questions_from_db(topic)
+    return []
+
+
 # OpenAI API를 이용해 오픽 질문 생성 전작업
-def generate_openai_questions(prompt: str, questions_needed: int = 3) -> List[str]:
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# 같은 요청(모델/프롬프트/파라미터)이 동시에 여러 세션에서 오면 업스트림 호출 1번을 공유 (single-flight)
+def generate_openai_questions(prompt: str, questions_needed: int = 3,
+                              priority: int = PRIORITY_NORMAL) -> List[str]:
+    request = _question_request(prompt)
+
+    def _fetch() -> str:
+        response = get_llm_scheduler().call(
+            "chat", lambda: get_openai_client().chat.completions.create(**request),
+            priority=priority, deadline=EXAM_CALL_TIMEOUT,
+        )
+        return response.choices[0].message.content
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",  # Use an appropriate model
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant for generating language test questions."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=150,
-            n=1,
-            stop=None,
-            temperature=0.7,
+        content = get_single_flight().do(flight_key("chat", request), _fetch)
+        return _parse_questions(content, questions_needed)
+    except Exception as e:
+        print(f"An error occurred with the OpenAI API: {e}")
+        return []
+
+
+# 비동기 버전: AsyncOpenAI로 호출, 타임아웃(스케줄러 대기·재시도 포함) 시 빈 리스트
+async def generate_openai_questions_async(prompt: str, questions_needed: int = 3,
+                                          client: Optional[AsyncOpenAI] = None,
+                                          timeout: float = EXAM_CALL_TIMEOUT,
+                                          priority: int = PRIORITY_NORMAL) -> List[str]:
+    if client is None:
+        client = get_async_openai_client()
+    request = _question_request(prompt)
+
+    async def _fetch() -> str:
+        response = await get_llm_scheduler().acall(
+            "chat", lambda: client.chat.completions.create(**request),
+            priority=priority, deadline=timeout,
         )
-        questions_text = response.choices[0].message.content.strip()
-        questions_list = [q.strip() for q in questions_text.split('\n') if q.strip()]
-        return questions_list[:questions_needed]
+        return response.choices[0].message.content
+
+    try:
+        content = await asyncio.wait_for(get_single_flight().ado(flight_key("chat", request), _fetch),
+                                         timeout=timeout)
+        return _parse_questions(content, questions_needed)
+    except asyncio.TimeoutError:
+        print(f"OpenAI question generation timed out after {timeout}s")
+        return []
     except Exception as e:
         print(f"An error occurred with the OpenAI API: {e}")
         return []
 
 
 # 질문 생성
-def make_questions(topic: str, category: str, level: str, count: int) -> List[str]:
+def make_questions(topic: str, category: str, level: str, count: int,
+                   db_questions: Optional[List[str]] = None,
+                   generated_bank: Optional[List[str]] = None) -> List[str]:
     """
     Generates OPIC questions:
-    - Fetches questions from the DB
+    - Fetches questions from the DB (skipped if db_questions is given, e.g. from fetch_seed_questions)
     - Uses them as context to generate 3 similar additional questions
+    - generated_bank: pre-generated questions (opic_generated); if it has enough, no LLM call is made
     """
 
-    db_questions = []
-
     # 1. Get questions from the database based on the category and topic
-    if category == 'survey':
-        db_questions = get_questions_from_db(topic)
-    elif category == 'role_play':
-        db_questions = get_role_play_questions_from_db(topic)
-    elif category == 'random_question':
-        db_questions = get_random_questions_from_db(topic)
+    if db_questions is None:
+        db_questions = _db_questions_for(topic, category)
+    db_questions = list(db_questions)
 
-    # 2. Always generate 3 additional similar questions using OpenAI
+    # 2. Add 3 similar AI questions sampled from the generated-question pool
     # f"appropriate for a speaker at an {level} level. "
+    # - 시드만으로 count를 채우면 뒤쪽 시드 일부를 뱅크/풀의 변형 질문으로 교체 (LLM 대기 없음)
+    # - 풀이 부족하거나 오래됐을 때만 OpenAI로 보충
+    if len(db_questions) >= count:
+        variants = _variant_questions(topic, category, level, count, db_questions, generated_bank)
+        return db_questions[:count - len(variants)] + variants
     openai_questions = []
-    if db_questions:  # context가 있어야만 실행
-        context_str = "\n".join(f"- {q}" for q in db_questions)
-        prompt = (
-            f"You are an OPIC question generator.\n\n"
-            f"Here are some sample questions about the topic '{topic}' in category '{category}':\n"
-            f"{context_str}\n\n"
-            f"Now, generate 3 new OPIC-style questions that are similar in style and difficulty, "
-            f"Make sure they are open-ended and not duplicates of the examples."
-        )
-        openai_questions = generate_openai_questions(prompt, 3)
+    banked = _sample_bank(generated_bank, db_questions)
+    if banked:
+        openai_questions = banked
+    elif db_questions:  # context가 있어야만 실행
+        cache = get_question_cache()
+        key = _pool_key(topic, category, level)
+        if cache.needs_refill(key):
+            prompt = _build_question_prompt(topic, category, db_questions)
+            cache.add(key, generate_openai_questions(prompt, 3))
+        openai_questions = cache.sample(key, 3, exclude=db_questions)
 
     # 3. Combine DB + AI questions
     final_questions = db_questions + openai_questions
 
     # 4. Return, but still respect 'count'
     return final_questions[:count]
+
+
+async def make_questions_async(topic: str, category: str, level: str, count: int,
+                               db_questions: Optional[List[str]] = None,
+                               generated_bank: Optional[List[str]] = None,
+                               client: Optional[AsyncOpenAI] = None,
+                               timeout: float = EXAM_CALL_TIMEOUT) -> List[str]:
+    """make_questions의 비동기 버전 (DB 조회는 스레드로, 생성은 AsyncOpenAI로)."""
+    if db_questions is None:
+        db_questions = await asyncio.to_thread(_db_questions_for, topic, category)
+    db_questions = list(db_questions)
+
+    if len(db_questions) >= count:
+        variants = _variant_questions(topic, category, level, count, db_questions, generated_bank)
+        return db_questions[:count - len(variants)] + variants
+    openai_questions = []
+    banked = _sample_bank(generated_bank, db_questions)
+    if banked:
+        openai_questions = banked
+    elif db_questions:
+        cache = get_question_cache()
+        key = _pool_key(topic, category, level)
+        if cache.needs_refill(key):
+            prompt = _build_question_prompt(topic, category, db_questions)
+            generated = await generate_openai_questions_async(prompt, 3, client=client, timeout=timeout)
+            await asyncio.to_thread(cache.add, key, generated)
+        openai_questions = cache.sample(key, 3, exclude=db_questions)
+
+    return (db_questions + openai_questions)[:count]
+
+
+async def iter_exam_questions_async(blueprint: List[Tuple[str, str, int]], level: str,
+                                    max_concurrency: int = EXAM_MAX_CONCURRENCY,
+                                    timeout: float = EXAM_CALL_TIMEOUT
+                                    ) -> AsyncIterator[Tuple[Tuple[str, str], List[str]]]:
+    """
+    Generates questions for every (category, topic, count) in the blueprint concurrently.
+    - Seeds and the pre-generated bank are fetched in one query each (fetch_seed_questions)
+    - Topics covered by the bank need no LLM call at all
+    - Remaining GPT calls run at the same time, capped by max_concurrency, each bounded by timeout
+    Yields ((category, topic), [questions]) in blueprint order as soon as each prefix is ready
+    (a timed-out topic falls back to its DB seeds).
+    GPT calls share the running loop's AsyncOpenAI client; the loop owner closes it
+    (close_async_openai_client) before the loop ends.
+    """
+    pairs = [(c, t) for c, t, _ in blueprint]
+    seeds, bank = await asyncio.gather(
+        asyncio.to_thread(fetch_seed_questions, pairs),
+        asyncio.to_thread(fetch_seed_questions, pairs, GENERATED_COLLECTION),
+    )
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    client = get_async_openai_client()
+
+    async def _one(category: str, topic: str, count: int) -> List[str]:
+        async with semaphore:
+            return await make_questions_async(topic, category, level, count,
+                                              db_questions=seeds[(category, topic)],
+                                              generated_bank=bank[(category, topic)],
+                                              client=client, timeout=timeout)
+
+    tasks = [asyncio.create_task(_one(c, t, n)) for c, t, n in blueprint]
+    try:
+        for (category, topic, _), task in zip(blueprint, tasks):
+            yield (category, topic), await task
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def make_exam_questions_async(blueprint: List[Tuple[str, str, int]], level: str,
+                                    max_concurrency: int = EXAM_MAX_CONCURRENCY,
+                                    timeout: float = EXAM_CALL_TIMEOUT) -> Dict[Tuple[str, str], List[str]]:
+    """Collects iter_exam_questions_async into {(category, topic): [questions]}."""
+    return {key: qs async for key, qs in iter_exam_questions_async(blueprint, level, max_concurrency, timeout)}
@@ -0,0 +1,121 @@
+"""
+생성 질문 풀 캐시
+- (category, topic, level, prompt_version) 키마다 GPT가 만든 질문 풀을 보관
+- TTL(오래된 풀은 stale 처리) + 최대 키 수(LRU) 기반 정리
+- 로컬 JSON 파일에 저장해 프로세스 재시작 후에도 유지
+"""
+import os
+import json
+import time
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DEFAULT_CACHE_PATH = os.getenv(
+    "QUESTION_CACHE_PATH", os.path.join(DATA_DIR, "cache", "question_pool.json")
+)
+# 풀 유효기간(초), 키 최대 개수, 키당 최대 질문 수, 이 수 미만이면 보충
+QUESTION_CACHE_TTL = float(os.getenv("QUESTION_CACHE_TTL", str(7 * 24 * 3600)))
+QUESTION_CACHE_MAX_KEYS = int(os.getenv("QUESTION_CACHE_MAX_KEYS", "500"))
+QUESTION_POOL_MAX_SIZE = int(os.getenv("QUESTION_POOL_MAX_SIZE", "30"))
+QUESTION_POOL_LOW_WATERMARK = int(os.getenv("QUESTION_POOL_LOW_WATERMARK", "6"))
+
+PoolKey = Tuple[str, str, str, str]
+
+
+def _key_str(key: PoolKey) -> str:
+    return "|".join(key)
+
+
+class QuestionPoolCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = QUESTION_CACHE_TTL,
+                 max_keys: int = QUESTION_CACHE_MAX_KEYS, max_pool_size: int = QUESTION_POOL_MAX_SIZE,
+                 low_watermark: int = QUESTION_POOL_LOW_WATERMARK):
+        self.path = path
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.max_pool_size = max_pool_size
+        self.low_watermark = low_watermark
+        self._lock = threading.Lock()
+        self._pools: Dict[str, Dict] = self._load()
+
+    # ---------- 저장소 ----------
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._pools, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"question cache save failed: {e}")
+
+    def _evict(self) -> None:
+        # 오래된(TTL 2배 초과) 풀 삭제 후, 최근 사용 순으로 max_keys 만큼만 유지
+        now = time.time()
+        for k in [k for k, v in self._pools.items() if now - v.get("created_at", 0) > self.ttl * 2]:
+            del self._pools[k]
+        if len(self._pools) > self.max_keys:
+            by_access = sorted(self._pools, key=lambda k: self._pools[k].get("accessed_at", 0))
+            for k in by_access[:len(self._pools) - self.max_keys]:
+                del self._pools[k]
+
+    # ---------- 조회/보충 ----------
+    def _is_fresh(self, entry: Optional[Dict]) -> bool:
+        return bool(entry) and time.time() - entry.get("created_at", 0) <= self.ttl
+
+    def needs_refill(self, key: PoolKey) -> bool:
+        """풀이 없거나, 오래됐거나, 질문 수가 low_watermark 미만이면 True."""
+        with self._lock:
+            entry = self._pools.get(_key_str(key))
+            return not self._is_fresh(entry) or len(entry.get("questions", [])) < self.low_watermark
+
+    def sample(self, key: PoolKey, k: int, exclude: Optional[List[str]] = None) -> List[str]:
+        """풀에서 k개 무작위 추출 (exclude에 있는 질문은 제외). 신선하지 않으면 빈 리스트."""
+        with self._lock:
+            entry = self._pools.get(_key_str(key))
+            if not self._is_fresh(entry):
+                return []
+            entry["accessed_at"] = time.time()
+            skip = set(exclude or [])
+            candidates = [q for q in entry.get("questions", []) if q not in skip]
+        return random.sample(candidates, min(k, len(candidates)))
+
+    def add(self, key: PoolKey, questions: List[str]) -> None:
+        """풀에 질문 추가 (중복 제거). stale 풀은 새로 시작."""
+        if not questions:
+            return
+        with self._lock:
+            ks = _key_str(key)
+            entry = self._pools.get(ks)
+            now = time.time()
+            if not self._is_fresh(entry):
+                entry = {"questions": [], "created_at": now}
+            merged = list(dict.fromkeys(entry["questions"] + [q for q in questions if q]))
+            entry["questions"] = merged[-self.max_pool_size:]
+            entry["accessed_at"] = now
+            self._pools[ks] = entry
+            self._evict()
+            self._save()
+
+
+_default_cache: Optional[QuestionPoolCache] = None
+_default_lock = threading.Lock()
+
+
+def get_question_cache() -> QuestionPoolCache:
+    """프로세스 전역 질문 풀 캐시 (지연 생성)."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = QuestionPoolCache()
+        return _default_cache
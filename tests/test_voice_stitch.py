@@ -0,0 +1,16 @@
+from app.utils.voice_utils import stitch_transcripts
+
+
+def test_stitch_overlap_with_cut_word():
+    parts = ["I usually go to the park on week", "the park on weekends with my dog.", "with my dog. It is fun"]
+    assert stitch_transcripts(parts) == "I usually go to the park on weekends with my dog. It is fun"
+
+
+def test_stitch_repeated_phrase_in_overlap():
+    # 겹침 안에서 반복되는 구절("the park")에 더 길게 잘못 맞추면 단어가 사라짐
+    assert stitch_transcripts(["I like the park. The", "the park is big"]) == "I like the park. The park is big"
+
+
+def test_stitch_without_overlap_concatenates():
+    assert stitch_transcripts(["Hello there my friend.", "Something else entirely."]) == \
+        "Hello there my friend. Something else entirely."